@@ -1,5 +1,20 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.analytics'
\ No newline at end of file
+    name = 'apps.analytics'
+
+    def ready(self):
+        # Load the risk model up front when serving requests: in the runserver
+        # child process, or in the gunicorn master before workers are forked.
+        # Management commands (migrate, shell, ...) keep loading it lazily.
+        serving = (
+            os.environ.get('RUN_MAIN') == 'true'
+            or os.path.basename(sys.argv[0]).startswith('gunicorn')
+        )
+        if serving:
+            from .ml_predictor import get_predictor
+            get_predictor()
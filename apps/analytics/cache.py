@@ -0,0 +1,40 @@
+# apps/analytics/cache.py - cached dashboard rollups
+
+from django.core.cache import cache
+
+# Entries are dropped when the underlying rows change (apps/assessments/signals.py);
+# the TTL only bounds staleness for changes that bypass signals
+DASHBOARD_CACHE_TTL = 60 * 5
+
+
+def dashboard_cache_key(student_id, course_id):
+    return f'analytics:dashboard:{student_id}:{course_id}'
+
+
+def invalidate_dashboard(pairs):
+    """Drop cached student rollups + risk for an iterable of (student_id, course_id)"""
+    keys = [dashboard_cache_key(student_id, course_id) for student_id, course_id in set(pairs)]
+    if keys:
+        cache.delete_many(keys)
+
+
+def course_info_cache_key(course_id):
+    return f'analytics:course_info:{course_id}'
+
+
+def invalidate_course_info(course_ids):
+    """Drop cached course + teacher info for an iterable of course_ids"""
+    keys = [course_info_cache_key(course_id) for course_id in set(course_ids)]
+    if keys:
+        cache.delete_many(keys)
+
+
+def class_weekly_cache_key(course_id):
+    return f'analytics:class_weekly:{course_id}'
+
+
+def invalidate_class_weekly(course_ids):
+    """Drop cached class weekly averages for an iterable of course_ids"""
+    keys = [class_weekly_cache_key(course_id) for course_id in set(course_ids)]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,41 @@
+# apps/analytics/management/commands/export_risk_model_onnx.py
+
+import os
+
+import joblib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Convert ml_models/std_risk_model.pkl to ONNX for onnxruntime inference (offline, needs skl2onnx)'
+
+    def handle(self, *args, **kwargs):
+        try:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            raise CommandError('skl2onnx is required for the export: pip install skl2onnx')
+
+        pkl_path = os.path.join(settings.ML_MODELS_DIR, 'std_risk_model.pkl')
+        onnx_path = os.path.join(settings.ML_MODELS_DIR, 'std_risk_model.onnx')
+
+        loaded = joblib.load(pkl_path)
+        # GridSearchCV result - export the best pipeline
+        estimator = getattr(loaded, 'best_estimator_', loaded)
+
+        # Input row: [gender, quiz_avg, assignment_avg, attendance_rate]
+        onx = convert_sklearn(
+            estimator,
+            initial_types=[('X', FloatTensorType([None, 4]))],
+            target_opset={'': 17, 'ai.onnx.ml': 3},
+        )
+        # Without probability=True the second output holds decision scores, not probabilities
+        meta = onx.metadata_props.add()
+        meta.key = 'has_proba'
+        meta.value = str(hasattr(estimator, 'predict_proba'))
+
+        with open(onnx_path, 'wb') as f:
+            f.write(onx.SerializeToString())
+
+        self.stdout.write(self.style.SUCCESS(f'ONNX model written to {onnx_path}'))
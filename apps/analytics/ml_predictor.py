@@ -1,27 +1,153 @@
 # apps/analytics/ml_predictor.py - COMPLETE FINAL VERSION
 
 import joblib
+import logging
 import numpy as np
-import pandas as pd
 from django.conf import settings
+from functools import lru_cache
 import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Model label -> (prediction_int, risk_base_score)
+LABEL_RISK = {
+    'high': (1, 0.8), 'high risk': (1, 0.8),  # High risk
+    'medium': (1, 0.5), 'medium risk': (1, 0.5), 'moderate': (1, 0.5),  # Medium risk (still at risk)
+    'low': (0, 0.2), 'low risk': (0, 0.2),  # Low risk
+}
+CLASS_INDEX_RISK = {2: (1, 0.8), 1: (1, 0.5), 0: (0, 0.2)}
 
 class RiskPredictor:
     def __init__(self):
         self.model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'std_risk_model.pkl')
+        self.onnx_path = os.path.join(settings.BASE_DIR, 'ml_models', 'std_risk_model.onnx')
         self.pipeline = None
+        self.session = None
+        self.session_has_proba = False
+        self.pipeline_has_proba = False
+        self.label_from_proba = False
+        self.linear_kernel = None
+        # One reusable input row per thread (the instance is shared across requests)
+        self._local = threading.local()
+
+        # Prefer the ONNX export (see export_risk_model_onnx); keep joblib as fallback
+        self.model_loaded = self._load_onnx_session() or self._load_joblib_pipeline()
+        if not self.model_loaded:
+            logger.warning("⚠️ Using fallback risk calculation")
+
+    def _load_onnx_session(self):
+        """Load the ONNX pipeline into an onnxruntime session, if both are available"""
+        if not os.path.exists(self.onnx_path):
+            return False
+        try:
+            import onnxruntime as ort
+
+            so = ort.SessionOptions()
+            so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            # One session per process, shared by all request threads (run() is
+            # thread-safe). Inputs are tiny, so keep each run on the calling thread
+            # instead of letting every worker spin up its own ORT thread pool.
+            so.intra_op_num_threads = 1
+            so.inter_op_num_threads = 1
+            so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            so.enable_mem_pattern = True
+            so.enable_cpu_mem_arena = True
+            self.session = ort.InferenceSession(
+                self.onnx_path, sess_options=so, providers=['CPUExecutionProvider']
+            )
+            self.session_input = self.session.get_inputs()[0].name
+            meta = self.session.get_modelmeta().custom_metadata_map
+            self.session_has_proba = meta.get('has_proba') == 'True'
+            logger.info("✅ ONNX model loaded successfully")
+            return True
+        except Exception as e:
+            logger.warning("⚠️ Could not load ONNX model: %s", e)
+            self.session = None
+            return False
+
+    def _load_joblib_pipeline(self):
+        """Load the pickled sklearn pipeline"""
+        try:
+            if os.path.exists(self.model_path):
+                self.pipeline = joblib.load(self.model_path)
+                self.pipeline_has_proba = hasattr(self.pipeline, 'predict_proba')
+                # The label is argmax(predict_proba) unless the probabilities are
+                # calibrated separately from the decision function (SVC probability=True)
+                estimator = getattr(self.pipeline, 'best_estimator_', self.pipeline)
+                final_step = estimator.steps[-1][1] if hasattr(estimator, 'steps') else estimator
+                self.label_from_proba = self.pipeline_has_proba and not getattr(final_step, 'probability', False)
+                if not self.pipeline_has_proba:
+                    self.linear_kernel = self._build_linear_kernel(estimator)
+                logger.info("✅ ML model loaded successfully")
+                return True
+        except Exception as e:
+            logger.warning("⚠️ Could not load ML model: %s", e)
+        return False
 
-        try:                                                                                                                                                                                                                                                                          
-            import joblib                                                                                                                                                                                                                                                             
-            model_path = self.model_path                                                                                                                                                                      
-            if os.path.exists(model_path):                                                                                                                                                                                                                                            
-                self.pipeline = joblib.load(model_path)                                                                                                                                                                                                                               
-                self.model_loaded = True                                                                                                                                                                                                                                              
-                print("✅ ML model loaded successfully")                                                                                                                                                                                                                              
-        except Exception as e:                                                                                                                                                                                                                                                        
-            print(f"⚠️ Could not load ML model: {e}")                                                                                                                                                                                                                                  
-            print("⚠️ Using fallback risk calculation")                                                                                                                                                                                                                                
-            self.model_loaded = False
+    @staticmethod
+    def _build_linear_kernel(estimator):
+        """
+        Extract the fitted parameters of a scaler + linear SVC pipeline so
+        _predict_linear can run it as plain numpy, without sklearn's per-call
+        input validation and dispatch
+        
+        Returns: (columns, mean, scale, coef, intercept, pairs, classes), or None
+        when the pipeline has any other shape
+        """
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import FunctionTransformer, StandardScaler
+        from sklearn.svm import SVC
+        
+        steps = getattr(estimator, 'steps', None)
+        if not steps or len(steps) != 2:
+            return None
+        preprocessor, clf = steps[0][1], steps[1][1]
+        if not isinstance(clf, SVC) or clf.kernel != 'linear' or clf.break_ties:
+            return None
+        
+        if isinstance(preprocessor, StandardScaler):
+            n = clf.coef_.shape[1]
+            parts = [(preprocessor, list(range(n)))]
+        elif isinstance(preprocessor, ColumnTransformer):
+            parts = [(trans, cols) for _, trans, cols in preprocessor.transformers_ if trans != 'drop']
+        else:
+            return None
+        
+        # Output column k is (x[columns[k]] - mean[k]) / scale[k]
+        columns, mean, scale = [], [], []
+        for trans, cols in parts:
+            cols = list(cols)
+            if not all(isinstance(c, (int, np.integer)) for c in cols):
+                return None
+            if isinstance(trans, StandardScaler):
+                mean.extend(trans.mean_ if trans.mean_ is not None else np.zeros(len(cols)))
+                scale.extend(trans.scale_ if trans.scale_ is not None else np.ones(len(cols)))
+            elif trans == 'passthrough' or (isinstance(trans, FunctionTransformer) and trans.func is None):
+                mean.extend([0.0] * len(cols))
+                scale.extend([1.0] * len(cols))
+            else:
+                return None
+            columns.extend(cols)
+        
+        # One-vs-one: decision column p compares classes pairs[p] = (i, j)
+        n_classes = len(clf.classes_)
+        pairs = np.array([(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)])
+        return (
+            np.array(columns), np.array(mean), np.array(scale),
+            clf.coef_.T.copy(), clf.intercept_.copy(), pairs, clf.classes_
+        )
+    
+    def _predict_linear(self, X):
+        """Labels from the extracted linear kernel; same votes as SVC.predict"""
+        columns, mean, scale, coef, intercept, pairs, classes = self.linear_kernel
+        decision = ((X[:, columns] - mean) / scale) @ coef + intercept
+        # Positive decision votes for the first class of the pair; ties go to the lowest index
+        winners = np.where(decision > 0, pairs[:, 0], pairs[:, 1])
+        votes = np.zeros((len(X), len(classes)), dtype=np.intp)
+        np.add.at(votes, (np.arange(len(X))[:, None], winners), 1)
+        return classes[np.argmax(votes, axis=1)]
+    
     #     self.load_model()
     
     # def load_model(self):
@@ -56,24 +182,27 @@ class RiskPredictor:
         
         Returns: dict with risk prediction
         """
-        if self.pipeline is None:
+        if self.session is None and self.pipeline is None:
             return self._fallback_prediction(quiz_avg, assignment_avg, attendance_rate)
         
         try:
             # Prepare input - pipeline expects this format
-            input_data = [[gender, quiz_avg, assignment_avg, attendance_rate]]
+            input_data = self._input_row(gender, quiz_avg, assignment_avg, attendance_rate)
             
-            print(f"📊 Input: [gender={gender}, quiz={quiz_avg}, assign={assignment_avg}, attend={attendance_rate}]")
+            logger.debug(
+                "📊 Input: [gender=%s, quiz=%s, assign=%s, attend=%s]",
+                gender, quiz_avg, assignment_avg, attendance_rate
+            )
             
             # Pipeline automatically scales and predicts
-            prediction = self.pipeline.predict(input_data)[0]
-            print(f"🔮 Prediction: {prediction} (type: {type(prediction)})")
+            prediction, proba = self._run_model(input_data)
+            logger.debug("🔮 Prediction: %s (type: %s)", prediction, type(prediction))
             
             # Convert string prediction to risk value
             prediction_value, base_risk = self._convert_prediction(prediction)
             
             # Get probability if available
-            risk_score = self._get_risk_score(input_data, base_risk)
+            risk_score = self._get_risk_score(base_risk, proba)
             
             # Determine risk level
             risk_level, color = self._get_risk_level(risk_score)
@@ -91,11 +220,124 @@ class RiskPredictor:
             }
             
         except Exception as e:
-            print(f"❌ Prediction error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Prediction error: %s", e)
             return self._fallback_prediction(quiz_avg, assignment_avg, attendance_rate)
     
+    def predict_risk_batch(self, features):
+        """
+        Predict risk for many students with a single model call
+        
+        Input: (N, 4) array, one row per student: [gender, quiz_avg, assignment_avg, attendance_rate]
+        
+        Returns: list of N dicts, same format as predict_risk
+        """
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != 4:
+            raise ValueError(f"Expected an (N, 4) feature array, got shape {X.shape}")
+        if len(X) == 0:
+            return []
+        
+        if self.session is None and self.pipeline is None:
+            return self._fallback_prediction_batch(X)
+        
+        try:
+            logger.debug("📊 Batch input: %d students", len(X))
+            
+            labels, proba = self._run_model_batch(X)
+            
+            # Convert each distinct label once, then broadcast back to the rows
+            unique_labels, inverse = np.unique(labels, return_inverse=True)
+            converted = [self._convert_prediction(label) for label in unique_labels]
+            prediction_values = np.array([c[0] for c in converted])[inverse]
+            base_risk = np.array([c[1] for c in converted], dtype=np.float64)[inverse]
+            
+            risk_scores = self._get_risk_score_batch(base_risk, proba)
+            
+            # Same thresholds as _get_risk_level
+            levels = np.where(risk_scores >= 0.65, 'HIGH RISK', np.where(risk_scores >= 0.35, 'MEDIUM RISK', 'LOW RISK'))
+            colors = np.where(risk_scores >= 0.65, 'red', np.where(risk_scores >= 0.35, 'orange', 'green'))
+            
+            return self._batch_results(X, risk_scores, levels, colors, prediction_values, model_used=True)
+            
+        except Exception as e:
+            logger.exception("❌ Batch prediction error: %s", e)
+            return self._fallback_prediction_batch(X)
+    
+    def _run_model_batch(self, X):
+        """
+        One forward pass over all rows
+        
+        Returns: (labels array, probabilities array or None)
+        """
+        if self.session is not None:
+            labels, scores = self.session.run(None, {self.session_input: np.asarray(X, dtype=np.float32)})
+            return labels, (scores if self.session_has_proba else None)
+        
+        if self.label_from_proba:
+            proba = self.pipeline.predict_proba(X)
+            return self.pipeline.classes_[np.argmax(proba, axis=1)], proba
+        
+        if self.linear_kernel is not None:
+            return self._predict_linear(X), None
+        
+        labels = self.pipeline.predict(X)
+        proba = self.pipeline.predict_proba(X) if self.pipeline_has_proba else None
+        return labels, proba
+    
+    def _get_risk_score_batch(self, base_risk, proba):
+        """Vectorized _get_risk_score"""
+        if proba is None:
+            return base_risk
+        proba = np.asarray(proba, dtype=np.float64)
+        if proba.shape[1] >= 3:  # [Low, Medium, High]
+            return proba[:, 1] + proba[:, 2]
+        elif proba.shape[1] == 2:
+            return proba[:, 1]
+        return base_risk
+    
+    def _batch_results(self, X, risk_scores, levels, colors, prediction_values, model_used):
+        """One result dict per row, in the predict_risk format"""
+        _, quiz, assignment, attendance = X.T
+        return [
+            {
+                'risk_score': round(float(score), 2),
+                'risk_level': str(level),
+                'risk_color': str(color),
+                'feedback': self._generate_feedback(q, a, att, level),
+                'prediction': int(pred),
+                'model_used': model_used
+            }
+            for score, level, color, pred, q, a, att in zip(
+                risk_scores, levels, colors, prediction_values, quiz, assignment, attendance
+            )
+        ]
+    
+    def _input_row(self, gender, quiz_avg, assignment_avg, attendance_rate):
+        """
+        Fill this thread's preallocated (1, 4) input buffer in place
+        
+        float32 for onnxruntime (its input type); float64 for the sklearn pipeline,
+        matching what it was fitted on.
+        """
+        dtype = np.float32 if self.session is not None else np.float64
+        x = getattr(self._local, 'x', None)
+        if x is None or x.dtype != dtype:
+            x = self._local.x = np.empty((1, 4), dtype=dtype)
+        x[0, 0] = gender
+        x[0, 1] = quiz_avg
+        x[0, 2] = assignment_avg
+        x[0, 3] = attendance_rate
+        return x
+    
+    def _run_model(self, input_data):
+        """
+        Run the loaded model on one input row
+        
+        Returns: (label, probabilities or None)
+        """
+        labels, proba = self._run_model_batch(input_data)
+        return labels[0], (proba[0] if proba is not None else None)
+    
     def _convert_prediction(self, prediction):
         """
         Convert model prediction to risk value
@@ -104,34 +346,23 @@ class RiskPredictor:
         Returns: (prediction_int, risk_base_score)
         """
         if isinstance(prediction, str):
-            pred_lower = prediction.lower().strip()
-            
-            if pred_lower in ['high', 'high risk']:
-                return 1, 0.8  # High risk
-            elif pred_lower in ['medium', 'medium risk', 'moderate']:
-                return 1, 0.5  # Medium risk (still at risk)
-            elif pred_lower in ['low', 'low risk']:
-                return 0, 0.2  # Low risk
+            converted = LABEL_RISK.get(prediction.lower().strip())
+            if converted is not None:
+                return converted
         
-        # Fallback for numeric predictions
+        # Fallback for numeric predictions (2+ = High, 1 = Medium, otherwise Low)
         if isinstance(prediction, (int, np.integer)):
-            if prediction >= 2:
-                return 1, 0.8  # High
-            elif prediction == 1:
-                return 1, 0.5  # Medium
-            else:
-                return 0, 0.2  # Low
+            return CLASS_INDEX_RISK.get(min(int(prediction), 2), (0, 0.2))
         
         # Default
-        print(f"⚠️ Unknown prediction format: {prediction}")
+        logger.warning("⚠️ Unknown prediction format: %s", prediction)
         return 0, 0.3
     
-    def _get_risk_score(self, input_data, base_risk):
+    def _get_risk_score(self, base_risk, proba=None):
         """Get risk probability score"""
         try:
-            if hasattr(self.pipeline, 'predict_proba'):
-                proba = self.pipeline.predict_proba(input_data)[0]
-                print(f"📈 Probabilities: {proba}")
+            if proba is not None:
+                logger.debug("📈 Probabilities: %s", proba)
                 
                 # If model gives probabilities for each class
                 if len(proba) >= 3:  # [Low, Medium, High]
@@ -147,7 +378,7 @@ class RiskPredictor:
             return risk_score
             
         except Exception as e:
-            print(f"⚠️ Error getting probability: {e}")
+            logger.warning("⚠️ Error getting probability: %s", e)
             return base_risk
     
     def _get_risk_level(self, risk_score):
@@ -183,7 +414,7 @@ class RiskPredictor:
     
     def _fallback_prediction(self, quiz_avg, assignment_avg, attendance_rate):
         """Fallback if model fails"""
-        print("⚠️ Using fallback prediction")
+        logger.debug("⚠️ Using fallback prediction")
         
         # Weighted average
         overall = (quiz_avg * 0.35 + assignment_avg * 0.35 + attendance_rate * 0.30)
@@ -215,5 +446,26 @@ class RiskPredictor:
             'model_used': False
         }
 
-# Create singleton instance
-ml_predictor = RiskPredictor()
\ No newline at end of file
+    def _fallback_prediction_batch(self, X):
+        """Vectorized _fallback_prediction"""
+        logger.debug("⚠️ Using fallback prediction for %d students", len(X))
+        
+        _, quiz, assignment, attendance = X.T
+        overall = (quiz * 0.35 + assignment * 0.35 + attendance * 0.30)
+        risk_scores = (100 - overall) / 100
+        
+        levels = np.where(risk_scores >= 0.6, 'HIGH RISK', np.where(risk_scores >= 0.3, 'MEDIUM RISK', 'LOW RISK'))
+        colors = np.where(risk_scores >= 0.6, 'red', np.where(risk_scores >= 0.3, 'orange', 'green'))
+        prediction_values = (risk_scores >= 0.3).astype(int)
+        
+        return self._batch_results(X, risk_scores, levels, colors, prediction_values, model_used=False)
+
+@lru_cache(maxsize=1)
+def get_predictor():
+    """
+    Process-wide RiskPredictor, loaded on first use.
+    
+    Warmed in AnalyticsConfig.ready() so a preloading server (gunicorn --preload)
+    unpickles the model once and forked workers share it copy-on-write.
+    """
+    return RiskPredictor()
@@ -0,0 +1,65 @@
+-- Per-student rollups for DashboardViewSet.student_dashboard, one round trip.
+-- Params: student_id, course_id. Every CTE yields exactly one row.
+-- The week_N columns must cover 1..DashboardViewSet.TOTAL_WEEKS.
+WITH att AS (
+    SELECT COUNT(*) AS total,
+           COALESCE(SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END), 0) AS present,
+           MAX(week_number) AS current_week
+    FROM attendance
+    WHERE student_id = %(student_id)s AND course_id = %(course_id)s
+),
+asg AS (
+    SELECT COALESCE(SUM(s.score), 0) AS earned,
+           COALESCE(SUM(a.max_score), 0) AS possible
+    FROM assignment_submissions s
+    JOIN assignments a ON a.assignment_id = s.assignment_id
+    WHERE s.student_id = %(student_id)s AND a.course_id = %(course_id)s
+      AND s.status <> 'missing'
+),
+quiz AS (
+    SELECT COALESCE(SUM(qs.score), 0) AS earned,
+           COALESCE(SUM(q.max_score), 0) AS possible
+    FROM quiz_scores qs
+    JOIN quizzes q ON q.quiz_id = qs.quiz_id
+    WHERE qs.student_id = %(student_id)s AND q.course_id = %(course_id)s
+),
+lab AS (
+    SELECT COALESCE(SUM(lp.score), 0) AS earned,
+           COALESCE(SUM(lp.max_score), 0) AS possible
+    FROM lab_participation lp
+    JOIN lab_activities l ON l.lab_id = lp.lab_id
+    WHERE lp.student_id = %(student_id)s AND l.course_id = %(course_id)s
+),
+-- The chart stays empty until the student has any graded work in week 2 or 3
+early AS (
+    SELECT CASE WHEN EXISTS (
+               SELECT 1 FROM assignment_submissions s
+               JOIN assignments a ON a.assignment_id = s.assignment_id
+               WHERE s.student_id = %(student_id)s AND a.course_id = %(course_id)s
+                 AND a.week_number IN (2, 3)
+           ) OR EXISTS (
+               SELECT 1 FROM quiz_scores qs
+               JOIN quizzes q ON q.quiz_id = qs.quiz_id
+               WHERE qs.student_id = %(student_id)s AND q.course_id = %(course_id)s
+                 AND q.week_number IN (2, 3)
+           ) THEN 1 ELSE 0 END AS show_data
+),
+weekly AS (
+    SELECT MAX(CASE WHEN week_number = 1 THEN student_score END) AS week_1,
+           MAX(CASE WHEN week_number = 2 THEN student_score END) AS week_2,
+           MAX(CASE WHEN week_number = 3 THEN student_score END) AS week_3,
+           MAX(CASE WHEN week_number = 4 THEN student_score END) AS week_4,
+           MAX(CASE WHEN week_number = 5 THEN student_score END) AS week_5,
+           MAX(CASE WHEN week_number = 6 THEN student_score END) AS week_6,
+           MAX(CASE WHEN week_number = 7 THEN student_score END) AS week_7
+    FROM weekly_progress
+    WHERE student_id = %(student_id)s AND course_id = %(course_id)s
+)
+SELECT att.total, att.present, att.current_week,
+       asg.earned, asg.possible,
+       quiz.earned, quiz.possible,
+       lab.earned, lab.possible,
+       early.show_data,
+       weekly.week_1, weekly.week_2, weekly.week_3, weekly.week_4,
+       weekly.week_5, weekly.week_6, weekly.week_7
+FROM att, asg, quiz, lab, early, weekly
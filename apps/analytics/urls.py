@@ -7,6 +7,11 @@ dashboard_view = DashboardViewSet.as_view({
     'get': 'student_dashboard'
 })
 
+course_risk_view = DashboardViewSet.as_view({
+    'get': 'course_risk'
+})
+
 urlpatterns = [
     path('dashboard/student_dashboard/', dashboard_view, name='student-dashboard'),
+    path('dashboard/course_risk/', course_risk_view, name='course-risk'),
 ]
\ No newline at end of file
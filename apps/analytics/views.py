@@ -1,19 +1,45 @@
 # apps/analytics/views.py - UPDATE student_dashboard method
 
+import os
+from functools import lru_cache
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from apps.assessments.models import (
-    Attendance, Assignment, AssignmentSubmission,
-    Quiz, QuizScore, LabParticipation
-)
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from apps.assessments.models import Attendance, AssignmentSubmission, QuizScore, WeeklyProgress
 from apps.courses.models import Course, CourseRegistration, CourseTeaching
-from .ml_predictor import ml_predictor
+from .cache import (
+    DASHBOARD_CACHE_TTL, class_weekly_cache_key, course_info_cache_key, dashboard_cache_key
+)
+from .ml_predictor import get_predictor
+
+with open(os.path.join(os.path.dirname(__file__), 'sql', 'dashboard.sql')) as f:
+    DASHBOARD_SQL = f.read()
+
+
+@lru_cache(maxsize=4096)
+def _cached_predict(quiz_avg, assignment_avg, attendance_rate, gender):
+    """
+    predict_risk depends only on its inputs, and engagement percentages are rounded
+    to 0.1, so many students (and repeat visits) share a feature tuple
+    """
+    return get_predictor().predict_risk(
+        quiz_avg=quiz_avg,
+        assignment_avg=assignment_avg,
+        attendance_rate=attendance_rate,
+        gender=gender
+    )
 
 class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     
+    # Weeks shown on the weekly progress chart
+    TOTAL_WEEKS = 7
+    
     @action(detail=False, methods=['get'])
     def student_dashboard(self, request):
         course_id = request.query_params.get('course_id')
@@ -21,28 +47,35 @@ class DashboardViewSet(viewsets.ViewSet):
         if not course_id:
             return Response({'error': 'course_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        student = request.user
-        
         try:
-            course = Course.objects.get(course_id=course_id)
-        except Course.DoesNotExist:
+            course_id = int(course_id)
+        except ValueError:
             return Response({'error': 'Course not found'}, status=404)
         
-        # Get course info
-        teacher_name = 'Not Assigned'
-        teaching = CourseTeaching.objects.filter(course=course).first()
-        if teaching:
-            teacher_name = teaching.teacher.get_full_name() or teaching.teacher.username
+        student = request.user
         
-        current_week = self._get_current_week(student, course_id)
+        # ✅ Get gender from student profile
+        # Female = 0, Male = 1
+        gender = self._get_gender(student)
         
-        # Calculate engagement metrics
-        engagement = {
-            'attendance': self._calc_attendance(student, course_id),
-            'assignments': self._calc_assignments(student, course_id),
-            'quizzes': self._calc_quizzes(student, course_id),
-            'lab_activity': self._calc_labs(student, course_id)
-        }
+        # Course info, the student's rollups and the class averages in one cache round trip
+        course_key = course_info_cache_key(course_id)
+        rollups_key = dashboard_cache_key(student.pk, course_id)
+        class_key = class_weekly_cache_key(course_id)
+        cached = cache.get_many([course_key, rollups_key, class_key])
+        
+        course_info = cached.get(course_key) or self._load_course_info(course_id)
+        if course_info is None:
+            return Response({'error': 'Course not found'}, status=404)
+        
+        rollups = cached.get(rollups_key)
+        if rollups is None or rollups['gender'] != gender:
+            rollups = self._load_student_rollups(student, course_id, gender)
+        engagement = rollups['engagement']
+        
+        class_averages = cached.get(class_key)
+        if class_averages is None:
+            class_averages = self._load_class_week_averages(course_id)
         
         # Overall engagement (exclude labs)
         overall_engagement = round(
@@ -50,29 +83,13 @@ class DashboardViewSet(viewsets.ViewSet):
             1
         )
         
-        # ✅ Get gender from student profile
-        # Female = 0, Male = 1
-        gender = self._get_gender(student)
-        
-        # ✅ Use ML model for risk prediction with gender
-        risk = ml_predictor.predict_risk(
-            quiz_avg=engagement['quizzes'],
-            assignment_avg=engagement['assignments'],
-            attendance_rate=engagement['attendance'],
-            gender=gender
-        )
-        
-        weekly = self._calc_weekly_progress(student, course_id)
+        weekly = self._calc_weekly_progress(rollups, class_averages)
         
         return Response({
             'course_info': {
-                'course_code': course.course_code,
-                'course_title': course.course_title,
-                'teacher_name': teacher_name,
-                'year': course.year,
-                'term': course.term,
-                'current_week': current_week,
-                'total_weeks': 7
+                **course_info,
+                'current_week': rollups['current_week'],
+                'total_weeks': self.TOTAL_WEEKS
             },
             'student': {
                 'name': student.get_full_name() or student.username,
@@ -82,10 +99,161 @@ class DashboardViewSet(viewsets.ViewSet):
             },
             'engagement': engagement,
             'overall_engagement': overall_engagement,
-            'risk': risk,
+            'risk': rollups['risk'],
             'weekly_progress': weekly
         })
     
+    @action(detail=False, methods=['get'])
+    def course_risk(self, request):
+        """
+        Risk prediction for every active student in a course (its teachers, or admins).
+        Engagement is aggregated per student in the database and all students are
+        scored with one batched model call.
+        """
+        if request.user.user_type not in ('teacher', 'admin'):
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        course_id = request.query_params.get('course_id')
+        if not course_id:
+            return Response({'error': 'course_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            course = Course.objects.get(course_id=int(course_id))
+        except (Course.DoesNotExist, ValueError):
+            return Response({'error': 'Course not found'}, status=404)
+        
+        # Teachers only see the roster of courses they teach
+        if request.user.user_type != 'admin' and not CourseTeaching.objects.filter(
+            course=course, teacher=request.user
+        ).exists():
+            return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        students = list(
+            CourseRegistration.objects.filter(course=course, status='active')
+            .order_by('student__last_name', 'student__first_name')
+            .values(
+                'student_id', 'student__first_name', 'student__last_name',
+                'student__username', 'student__student_id', 'student__gender'
+            )
+        )
+        student_ids = [s['student_id'] for s in students]
+        
+        attendance = {
+            row['student_id']: self._percent(row['present'], row['total'])
+            for row in Attendance.objects.filter(course=course, student_id__in=student_ids)
+            .values('student_id')
+            .annotate(total=Count('attendance_id'), present=Count('attendance_id', filter=Q(status='present')))
+            .order_by()
+            .iterator(chunk_size=1000)
+        }
+        assignments = {
+            row['student_id']: self._percent(row['earned'] or 0, row['possible'])
+            for row in AssignmentSubmission.objects.filter(assignment__course=course, student_id__in=student_ids)
+            .exclude(status='missing')
+            .values('student_id')
+            .annotate(earned=Sum('score'), possible=Sum('assignment__max_score'))
+            .order_by()
+            .iterator(chunk_size=1000)
+        }
+        quizzes = {
+            row['student_id']: self._percent(row['earned'], row['possible'])
+            for row in QuizScore.objects.filter(quiz__course=course, student_id__in=student_ids)
+            .values('student_id')
+            .annotate(earned=Sum('score'), possible=Sum('quiz__max_score'))
+            .order_by()
+            .iterator(chunk_size=1000)
+        }
+        
+        results = []
+        features = []
+        for s in students:
+            sid = s['student_id']
+            gender = 0 if s['student__gender'] == 0 else 1
+            engagement = {
+                'attendance': attendance.get(sid, 0),
+                'assignments': assignments.get(sid, 0),
+                'quizzes': quizzes.get(sid, 0),
+            }
+            features.append([gender, engagement['quizzes'], engagement['assignments'], engagement['attendance']])
+            results.append({
+                'name': f"{s['student__first_name']} {s['student__last_name']}".strip() or s['student__username'],
+                'student_id': s['student__student_id'] or 'N/A',
+                'engagement': engagement,
+            })
+        
+        if features:
+            for result, risk in zip(results, get_predictor().predict_risk_batch(features)):
+                result['risk'] = risk
+        
+        return Response({
+            'course_code': course.course_code,
+            'course_title': course.course_title,
+            'students': results
+        })
+    
+    @staticmethod
+    def _percent(earned, possible):
+        return round((earned / possible * 100) if possible and possible > 0 else 0, 1)
+    
+    def _load_course_info(self, course_id):
+        """Course fields + teacher name for the dashboard header, cached per course; None if no such course"""
+        course = Course.objects.filter(course_id=course_id).first()
+        if course is None:
+            return None
+        
+        teacher_name = 'Not Assigned'
+        teaching = CourseTeaching.objects.filter(course=course).select_related('teacher').first()
+        if teaching:
+            teacher_name = teaching.teacher.get_full_name() or teaching.teacher.username
+        
+        course_info = {
+            'course_code': course.course_code,
+            'course_title': course.course_title,
+            'teacher_name': teacher_name,
+            'year': course.year,
+            'term': course.term,
+        }
+        cache.set(course_info_cache_key(course_id), course_info, DASHBOARD_CACHE_TTL)
+        return course_info
+    
+    def _load_student_rollups(self, student, course_id, gender):
+        """
+        Engagement percentages, current week, stored week scores and ML risk for one
+        student, cached per (student, course) until the rows change. The database work
+        is the single query in sql/dashboard.sql.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(DASHBOARD_SQL, {'student_id': student.pk, 'course_id': course_id})
+            row = cursor.fetchone()
+        
+        (att_total, att_present, current_week,
+         asg_earned, asg_possible, quiz_earned, quiz_possible,
+         lab_earned, lab_possible, show_data) = row[:10]
+        engagement = {
+            'attendance': self._percent(att_present, att_total),
+            'assignments': self._percent(asg_earned, asg_possible),
+            'quizzes': self._percent(quiz_earned, quiz_possible),
+            'lab_activity': self._percent(lab_earned, lab_possible)
+        }
+        
+        # ✅ Use ML model for risk prediction with gender (copied: the memoized dict is shared)
+        risk = dict(_cached_predict(
+            engagement['quizzes'], engagement['assignments'], engagement['attendance'], gender
+        ))
+        
+        rollups = {
+            'gender': gender,
+            'current_week': current_week if current_week is not None else 1,
+            'engagement': engagement,
+            'risk': risk,
+            'show_data': bool(show_data),
+            'week_scores': {
+                week: score for week, score in enumerate(row[10:], start=1) if score is not None
+            }
+        }
+        cache.set(dashboard_cache_key(student.pk, course_id), rollups, DASHBOARD_CACHE_TTL)
+        return rollups
+    
     def _get_gender(self, student):
         """
         Get gender from student profile
@@ -108,78 +276,16 @@ class DashboardViewSet(viewsets.ViewSet):
         # Default to Male if not specified (or you can default to Female)
         return 1
     
-    def _get_current_week(self, student, course_id):
-        latest = Attendance.objects.filter(
-            student=student,
-            course_id=course_id
-        ).order_by('-week_number').first()
-        
-        return latest.week_number if latest else 1
-    
-    def _calc_attendance(self, student, course_id):
-        total = Attendance.objects.filter(student=student, course_id=course_id).count()
-        present = Attendance.objects.filter(student=student, course_id=course_id, status='present').count()
-        return round((present / total * 100) if total > 0 else 0, 1)
-    
-    def _calc_assignments(self, student, course_id):
-        subs = AssignmentSubmission.objects.filter(
-            student=student, assignment__course_id=course_id
-        ).exclude(status='missing')
-        earned = sum(s.score or 0 for s in subs)
-        possible = sum(s.assignment.max_score for s in subs)
-        return round((earned / possible * 100) if possible > 0 else 0, 1)
-    
-    def _calc_quizzes(self, student, course_id):
-        scores = QuizScore.objects.filter(student=student, quiz__course_id=course_id)
-        earned = sum(s.score for s in scores)
-        possible = sum(s.quiz.max_score for s in scores)
-        return round((earned / possible * 100) if possible > 0 else 0, 1)
-    
-    def _calc_labs(self, student, course_id):
-        labs = LabParticipation.objects.filter(student=student, lab__course_id=course_id)
-        earned = sum(l.score for l in labs)
-        possible = sum(l.max_score for l in labs)
-        return round((earned / possible * 100) if possible > 0 else 0, 1)
-    
-    def _calc_weekly_progress(self, student, course_id):
-        """Calculate weekly progress for 7 weeks"""
+    def _calc_weekly_progress(self, rollups, class_averages):
+        """Calculate weekly progress for TOTAL_WEEKS weeks"""
         result = []
         
-        all_students = CourseRegistration.objects.filter(
-            course_id=course_id,
-            status='active'
-        ).values_list('student_id', flat=True)
-        
-        has_week_2_data = (
-            AssignmentSubmission.objects.filter(
-                student=student, assignment__course_id=course_id, assignment__week_number=2
-            ).exists() or
-            QuizScore.objects.filter(
-                student=student, quiz__course_id=course_id, quiz__week_number=2
-            ).exists()
-        )
-        
-        has_week_3_data = (
-            AssignmentSubmission.objects.filter(
-                student=student, assignment__course_id=course_id, assignment__week_number=3
-            ).exists() or
-            QuizScore.objects.filter(
-                student=student, quiz__course_id=course_id, quiz__week_number=3
-            ).exists()
-        )
-        
-        show_data = has_week_2_data or has_week_3_data
+        show_data = rollups['show_data']
+        student_scores = rollups['week_scores']
         
-        for week in range(1, 8):
-            student_score = self._calc_week_score(student, course_id, week)
-            
-            week_scores = []
-            for sid in all_students:
-                score = self._calc_week_score_for_student(sid, course_id, week)
-                if score is not None:
-                    week_scores.append(score)
-            
-            class_avg = sum(week_scores) / len(week_scores) if week_scores else None
+        for week in range(1, self.TOTAL_WEEKS + 1):
+            student_score = student_scores.get(week)
+            class_avg = class_averages.get(week)
             
             if show_data and student_score is not None:
                 result.append({
@@ -198,36 +304,23 @@ class DashboardViewSet(viewsets.ViewSet):
         
         return result
     
-    def _calc_week_score(self, student, course_id, week_number):
-        assignment_subs = AssignmentSubmission.objects.filter(
-            student=student,
-            assignment__course_id=course_id,
-            assignment__week_number=week_number
-        ).exclude(status='missing')
-        
-        quiz_scores = QuizScore.objects.filter(
-            student=student,
-            quiz__course_id=course_id,
-            quiz__week_number=week_number
-        )
-        
-        scores = []
-        
-        for sub in assignment_subs:
-            if sub.score is not None:
-                percentage = (sub.score / sub.assignment.max_score * 100) if sub.assignment.max_score > 0 else 0
-                scores.append(percentage)
-        
-        for qs in quiz_scores:
-            percentage = (qs.score / qs.quiz.max_score * 100) if qs.quiz.max_score > 0 else 0
-            scores.append(percentage)
+    def _load_class_week_averages(self, course_id):
+        """
+        {week: average week score of active students}, cached per course until
+        a grade, assessment or registration in the course changes
+        """
+        active_students = CourseRegistration.objects.filter(
+            course_id=course_id,
+            status='active'
+        ).values('student_id')
         
-        return sum(scores) / len(scores) if scores else None
-    
-    def _calc_week_score_for_student(self, student_id, course_id, week_number):
-        from apps.users.models import User
-        try:
-            student = User.objects.get(user_id=student_id)
-            return self._calc_week_score(student, course_id, week_number)
-        except:
-            return None
\ No newline at end of file
+        # One grouped query over the denormalized per-student week scores
+        averages = dict(
+            WeeklyProgress.objects.filter(
+                course_id=course_id,
+                student_id__in=active_students,
+                week_number__range=(1, self.TOTAL_WEEKS)
+            ).values('week_number').annotate(avg=Avg('student_score')).order_by().values_list('week_number', 'avg')
+        )
+        cache.set(class_weekly_cache_key(course_id), averages, DASHBOARD_CACHE_TTL)
+        return averages
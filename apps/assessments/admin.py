@@ -2,9 +2,13 @@
 
 import csv
 import io
-from datetime import datetime
+import itertools
 
 from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Concat
 from django.shortcuts import render, redirect
 from django.urls import path
 from django.utils.html import format_html
@@ -13,8 +17,10 @@ from .models import (
     Attendance, Assignment, AssignmentSubmission,
     Quiz, QuizScore, LabActivity, LabParticipation
 )
+from .utils import CSV_TRUE_VALUES, csv_column, parse_csv_date, refresh_assessment_rows, upsert_rows
+from ..analytics.cache import invalidate_dashboard
 from ..users.models import User
-from ..courses.models import Course
+from ..courses.models import Course, CourseRegistration
 
 
 class CSVUploadMixin:
@@ -23,8 +29,12 @@ class CSVUploadMixin:
 
     # Subclasses must define these
     csv_expected_columns = ''
+    csv_required_columns = frozenset()
     csv_example = ''
 
+    # Rows parsed, resolved and written per round of queries
+    csv_batch_size = 1000
+
     def get_urls(self):
         custom_urls = [
             path(
@@ -46,20 +56,22 @@ class CSVUploadMixin:
                 messages.error(request, 'File must be a .csv file.')
                 return redirect('..')
 
+            # Decode and parse as the rows are consumed; only one batch is held in memory
+            reader = csv.reader(io.TextIOWrapper(csv_file, encoding='utf-8', newline=''))
             try:
-                decoded = csv_file.read().decode('utf-8')
-                reader = csv.DictReader(io.StringIO(decoded))
-                rows = list(reader)
-            except Exception as e:
+                fieldnames = next(reader, [])
+                rows = (row for row in reader if row)  # blank lines are skipped, as DictReader does
+                first_row = next(rows, None)
+                if first_row is None:
+                    messages.error(request, 'CSV file is empty.')
+                    return redirect('..')
+                created, updated, errors = self.import_csv_rows(
+                    fieldnames, itertools.chain([first_row], rows)
+                )
+            except (UnicodeDecodeError, csv.Error) as e:
                 messages.error(request, f'Failed to parse CSV: {e}')
                 return redirect('..')
 
-            if not rows:
-                messages.error(request, 'CSV file is empty.')
-                return redirect('..')
-
-            created, updated, errors = self.process_csv_rows(rows)
-
             context = {
                 **self.admin_site.each_context(request),
                 'model_name': self.model._meta.verbose_name_plural.title(),
@@ -80,35 +92,154 @@ class CSVUploadMixin:
         }
         return render(request, 'admin/assessments/csv_upload.html', context)
 
-    def process_csv_rows(self, rows):
-        """Override in subclass. Return (created, updated, errors_list)."""
+    def import_csv_rows(self, fieldnames, rows):
+        """
+        Check the header, then feed rows to process_csv_rows in batches of
+        csv_batch_size. Rows are plain lists read through a {column name: index}
+        map built from the header, with every cell stripped of surrounding
+        whitespace; short rows are padded with empty cells.
+        The upload is one transaction: a parse error part-way through leaves
+        nothing half-imported.
+        """
+        columns = {name: i for i, name in enumerate(fieldnames)}
+        missing = self.csv_required_columns - columns.keys()
+        if missing:
+            return 0, 0, [f'Missing columns: {", ".join(missing)}']
+
+        width = len(fieldnames)
+        rows = ([cell.strip() for cell in row] + [''] * (width - len(row)) for row in rows)
+
+        created, updated, errors = 0, 0, []
+        line = 2  # first data row, after the header
+        batches = iter(lambda: list(itertools.islice(rows, self.csv_batch_size)), [])
+        with transaction.atomic():
+            for batch in batches:
+                batch_created, batch_updated, batch_errors = self.process_csv_rows(batch, columns, start=line)
+                created += batch_created
+                updated += batch_updated
+                errors.extend(batch_errors)
+                line += len(batch)
+        return created, updated, errors
+
+    def process_csv_rows(self, rows, columns, start=2):
+        """
+        Override in subclass. Handle one batch of rows, numbered from start;
+        columns maps header names to row indexes. Return (created, updated, errors_list).
+        """
         raise NotImplementedError
 
+    # Lookups for a batch, one query each, so rows resolve against dicts
+
+    @staticmethod
+    def get_students(rows, columns):
+        """{student_id: student} for every student_id in the batch"""
+        col = columns['student_id']
+        student_ids = {row[col] for row in rows}
+        return {
+            student.student_id: student
+            for student in User.objects.filter(student_id__in=student_ids, user_type='student')
+        }
+
     @staticmethod
-    def get_student(student_id):
-        try:
-            return User.objects.get(student_id=student_id, user_type='student')
-        except User.DoesNotExist:
-            return None
+    def get_courses(rows, columns):
+        """{course_code: course} for every course_code in the batch"""
+        col = columns['course_code']
+        course_codes = {row[col] for row in rows}
+        return {course.course_code: course for course in Course.objects.filter(course_code__in=course_codes)}
 
     @staticmethod
-    def get_course(course_code):
-        try:
-            return Course.objects.get(course_code=course_code)
-        except Course.DoesNotExist:
-            return None
+    def get_course_items(model, courses, rows, col):
+        """{(course_id, title): item} for the assignments/quizzes/labs named in the batch, col being the title index"""
+        titles = {row[col] for row in rows}
+        items = model.objects.filter(course__in=courses.values(), title__in=titles).order_by('-pk')
+        # Keep the oldest row when a course reuses a title
+        return {(item.course_id, item.title): item for item in items}
+
+
+class CourseItemListFilter(admin.RelatedFieldListFilter):
+    """Sidebar filter for assessments; their labels include the course, so join it once"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        queryset = field.related_model._default_manager.complex_filter(
+            field.get_limit_choices_to()
+        ).select_related('course')
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return [(obj.pk, str(obj)) for obj in queryset]
+
+
+class DeferredChangeList(ChangeList):
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(*self.model_admin.list_defer)
+
+
+class ListDeferMixin:
+    """Leave list_defer columns (TextFields nobody lists) out of the changelist query; forms still load them"""
+    list_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredChangeList
+
+
+def full_name(user_field):
+    """SQL counterpart of User.get_full_name() for the user behind user_field"""
+    return Concat(f'{user_field}__first_name', Value(' '), f'{user_field}__last_name')
+
+
+# Status badges, rendered once per choice rather than per changelist row
+BADGE_HTML = (
+    '<span style="background:{bg}; color:{c}; padding:3px 10px; border-radius:12px; '
+    'font-size:11px; font-weight:700;">{t}</span>'
+)
+DEFAULT_BADGE_COLORS = ('#111827', '#F3F4F6')
+
+
+def render_badge(label, colors=DEFAULT_BADGE_COLORS):
+    color, background = colors
+    return format_html(BADGE_HTML, bg=background, c=color, t=label)
+
+
+def render_choice_badges(field, color_map):
+    """{stored value: badge} for every choice of field; color_map holds (color, background)"""
+    return {
+        value: render_badge(label, color_map.get(value, DEFAULT_BADGE_COLORS))
+        for value, label in field.flatchoices
+    }
+
+
+ATTENDANCE_BADGES = render_choice_badges(Attendance._meta.get_field('status'), {
+    'present': ('#065F46', '#D1FAE5'),
+    'absent': ('#991B1B', '#FEE2E2'),
+})
+SUBMISSION_BADGES = render_choice_badges(AssignmentSubmission._meta.get_field('status'), {
+    'graded': ('#065F46', '#D1FAE5'),
+    'submitted': ('#1E3A5F', '#DBEAFE'),
+    'late-submitted': ('#92400E', '#FEF3C7'),
+    'Not Submitted': ('#991B1B', '#FEE2E2'),
+})
+LAB_ATTENDANCE_BADGES = {
+    True: render_badge('Yes', ('#065F46', '#D1FAE5')),
+    False: render_badge('No', ('#991B1B', '#FEE2E2')),
+}
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(CSVUploadMixin, admin.ModelAdmin):
+class AttendanceAdmin(ListDeferMixin, CSVUploadMixin, admin.ModelAdmin):
     list_display = ['student_name', 'course_code', 'date', 'week_number', 'status_badge', 'show_section']
+    list_select_related = ('student', 'course')
+    list_defer = ('course__description',)
     list_filter = ['status', 'week_number', 'date', 'section', 'student', 'course']
     search_fields = ['student__email', 'student__username', 'student__first_name', 'student__last_name', 'course__course_code']
+    autocomplete_fields = ['student']
     date_hierarchy = 'date'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(student_full_name=full_name('student'))
+
     @admin.display(description='Student', ordering='student__first_name')
     def student_name(self, obj):
-        return obj.student.get_full_name() or obj.student.username
+        return obj.student_full_name.strip() or obj.student.username
 
     @admin.display(description='Course', ordering='course__course_code')
     def course_code(self, obj):
@@ -116,14 +247,7 @@ class AttendanceAdmin(CSVUploadMixin, admin.ModelAdmin):
 
     @admin.display(description='Status', ordering='status')
     def status_badge(self, obj):
-        colors = {'present': '#065F46', 'absent': '#991B1B'}
-        bg = {'present': '#D1FAE5', 'absent': '#FEE2E2'}
-        color = colors.get(obj.status, '#111827')
-        background = bg.get(obj.status, '#F3F4F6')
-        return format_html(
-            '<span style="background:{bg}; color:{c}; padding:3px 10px; border-radius:12px; font-size:11px; font-weight:700;">{t}</span>',
-            bg=background, c=color, t=obj.get_status_display()
-        )
+        return ATTENDANCE_BADGES.get(obj.status) or render_badge(obj.get_status_display())
 
     @admin.display(description='Section', ordering='section')
     def show_section(self, obj):
@@ -137,14 +261,11 @@ class AttendanceAdmin(CSVUploadMixin, admin.ModelAdmin):
     )
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "student":
-            kwargs["queryset"] = User.objects.filter(
-                user_type='student'
-            ).select_related().order_by('first_name', 'last_name')
         if db_field.name == "course":
+            # Semijoin rather than DISTINCT over the registration join
             kwargs["queryset"] = Course.objects.filter(
-                courseregistration__status='active'
-            ).distinct().order_by('course_code')
+                Exists(CourseRegistration.objects.filter(course=OuterRef('pk'), status='active'))
+            ).order_by('course_code')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def get_form(self, request, obj=None, **kwargs):
@@ -153,49 +274,61 @@ class AttendanceAdmin(CSVUploadMixin, admin.ModelAdmin):
         form.base_fields['course'].help_text = 'Select the course for this attendance record'
         return form
 
-    def process_csv_rows(self, rows):
-        required = {'student_id', 'course_code', 'date', 'week_number', 'status', 'section'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return 0, 0, [f'Missing columns: {", ".join(missing)}']
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self.get_student(row['student_id'].strip())
+    csv_required_columns = frozenset({'student_id', 'course_code', 'date', 'week_number', 'status', 'section'})
+
+    def process_csv_rows(self, rows, columns, start=2):
+        student_col, course_col = columns['student_id'], columns['course_code']
+        students = self.get_students(rows, columns)
+        courses = self.get_courses(rows, columns)
+        date_col, section_col = columns['date'], columns['section']
+        week_col, status_col = columns['week_number'], columns['status']
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col])
             if not student:
-                errors.append(f'Row {i}: student_id "{row["student_id"]}" not found.')
+                errors.append(f'Row {i}: student_id "{row[student_col]}" not found.')
                 continue
 
-            course = self.get_course(row['course_code'].strip())
+            course = courses.get(row[course_col])
             if not course:
-                errors.append(f'Row {i}: course_code "{row["course_code"]}" not found.')
+                errors.append(f'Row {i}: course_code "{row[course_col]}" not found.')
                 continue
 
             try:
-                date = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+                date = parse_csv_date(row[date_col])
             except ValueError:
-                errors.append(f'Row {i}: invalid date "{row["date"]}" (expected YYYY-MM-DD).')
+                errors.append(f'Row {i}: invalid date "{row[date_col]}" (expected YYYY-MM-DD).')
                 continue
 
-            obj, was_created = Attendance.objects.update_or_create(
+            try:
+                week_number = int(row[week_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid week_number "{row[week_col]}" (expected a whole number).')
+                continue
+
+            objs.append(Attendance(
                 student=student,
                 course=course,
                 date=date,
-                section=row['section'].strip(),
-                defaults={
-                    'week_number': int(row['week_number']),
-                    'status': row['status'].strip(),
-                },
-            )
-            created += was_created
-            updated += not was_created
-
+                section=row[section_col],
+                week_number=week_number,
+                status=row[status_col],
+            ))
+
+        created, updated = upsert_rows(
+            Attendance, objs,
+            unique_fields=['student', 'course', 'date', 'section'],
+            update_fields=['week_number', 'status'],
+        )
+        invalidate_dashboard((obj.student_id, obj.course_id) for obj in objs)
         return created, updated, errors
 
 
 @admin.register(Assignment)
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(ListDeferMixin, admin.ModelAdmin):
     list_display = ['title', 'show_course', 'due_date', 'max_score', 'week_number']
+    list_select_related = ('course',)
+    list_defer = ('description', 'course__description')
     list_filter = ['course', 'week_number', 'due_date']
     search_fields = ['title', 'course__course_code']
     date_hierarchy = 'due_date'
@@ -206,15 +339,21 @@ class AssignmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(AssignmentSubmission)
-class AssignmentSubmissionAdmin(CSVUploadMixin, admin.ModelAdmin):
+class AssignmentSubmissionAdmin(ListDeferMixin, CSVUploadMixin, admin.ModelAdmin):
     list_display = ['student_name', 'assignment_title', 'score_display', 'status_badge', 'submission_date']
-    list_filter = ['status', 'submission_date', 'student', 'assignment']
+    list_select_related = ('student', 'assignment')
+    list_defer = ('assignment__description',)
+    list_filter = ['status', 'submission_date', 'student', ('assignment', CourseItemListFilter)]
     search_fields = ['student__email', 'student__username', 'student__first_name', 'student__last_name', 'assignment__title']
+    autocomplete_fields = ['student', 'assignment']
     date_hierarchy = 'submission_date'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(student_full_name=full_name('student'))
+
     @admin.display(description='Student', ordering='student__first_name')
     def student_name(self, obj):
-        return obj.student.get_full_name() or obj.student.username
+        return obj.student_full_name.strip() or obj.student.username
 
     @admin.display(description='Assignment', ordering='assignment__title')
     def assignment_title(self, obj):
@@ -232,17 +371,7 @@ class AssignmentSubmissionAdmin(CSVUploadMixin, admin.ModelAdmin):
 
     @admin.display(description='Status', ordering='status')
     def status_badge(self, obj):
-        color_map = {
-            'graded': ('#065F46', '#D1FAE5'),
-            'submitted': ('#1E3A5F', '#DBEAFE'),
-            'late-submitted': ('#92400E', '#FEF3C7'),
-            'Not Submitted': ('#991B1B', '#FEE2E2'),
-        }
-        color, bg = color_map.get(obj.status, ('#111827', '#F3F4F6'))
-        return format_html(
-            '<span style="background:{bg}; color:{c}; padding:3px 10px; border-radius:12px; font-size:11px; font-weight:700;">{t}</span>',
-            bg=bg, c=color, t=obj.get_status_display()
-        )
+        return SUBMISSION_BADGES.get(obj.status) or render_badge(obj.get_status_display())
 
     csv_expected_columns = 'student_id, course_code, assignment_title, score, status'
     csv_example = (
@@ -251,48 +380,59 @@ class AssignmentSubmissionAdmin(CSVUploadMixin, admin.ModelAdmin):
         'STU002,CS101,Homework 1,90,graded'
     )
 
-    def process_csv_rows(self, rows):
-        required = {'student_id', 'course_code', 'assignment_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return 0, 0, [f'Missing columns: {", ".join(missing)}']
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self.get_student(row['student_id'].strip())
+    csv_required_columns = frozenset({'student_id', 'course_code', 'assignment_title', 'score'})
+
+    def process_csv_rows(self, rows, columns, start=2):
+        student_col, course_col = columns['student_id'], columns['course_code']
+        students = self.get_students(rows, columns)
+        courses = self.get_courses(rows, columns)
+        title_col, score_col = columns['assignment_title'], columns['score']
+        assignments = self.get_course_items(Assignment, courses, rows, title_col)
+        row_status = csv_column(columns, 'status', 'graded')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col])
             if not student:
-                errors.append(f'Row {i}: student_id "{row["student_id"]}" not found.')
+                errors.append(f'Row {i}: student_id "{row[student_col]}" not found.')
                 continue
 
-            course = self.get_course(row['course_code'].strip())
+            course = courses.get(row[course_col])
             if not course:
-                errors.append(f'Row {i}: course_code "{row["course_code"]}" not found.')
+                errors.append(f'Row {i}: course_code "{row[course_col]}" not found.')
+                continue
+
+            assignment = assignments.get((course.course_id, row[title_col]))
+            if not assignment:
+                errors.append(f'Row {i}: assignment "{row[title_col]}" not found in {course.course_code}.')
                 continue
 
             try:
-                assignment = Assignment.objects.get(course=course, title=row['assignment_title'].strip())
-            except Assignment.DoesNotExist:
-                errors.append(f'Row {i}: assignment "{row["assignment_title"]}" not found in {course.course_code}.')
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
                 continue
 
-            row_status = row.get('status', 'graded').strip() or 'graded'
-            obj, was_created = AssignmentSubmission.objects.update_or_create(
+            objs.append(AssignmentSubmission(
                 assignment=assignment,
                 student=student,
-                defaults={
-                    'score': float(row['score']),
-                    'status': row_status,
-                },
-            )
-            created += was_created
-            updated += not was_created
-
+                score=score,
+                status=row_status(row) or 'graded',
+            ))
+
+        created, updated = upsert_rows(
+            AssignmentSubmission, objs,
+            unique_fields=['assignment', 'student'],
+            update_fields=['score', 'status'],
+        )
+        refresh_assessment_rows(objs, 'assignment')
         return created, updated, errors
 
 
 @admin.register(Quiz)
-class QuizAdmin(admin.ModelAdmin):
+class QuizAdmin(ListDeferMixin, admin.ModelAdmin):
     list_display = ['title', 'show_course', 'date', 'max_score', 'week_number']
+    list_select_related = ('course',)
+    list_defer = ('description', 'course__description')
     list_filter = ['course', 'week_number', 'date']
     search_fields = ['title', 'course__course_code']
     date_hierarchy = 'date'
@@ -303,15 +443,21 @@ class QuizAdmin(admin.ModelAdmin):
 
 
 @admin.register(QuizScore)
-class QuizScoreAdmin(CSVUploadMixin, admin.ModelAdmin):
+class QuizScoreAdmin(ListDeferMixin, CSVUploadMixin, admin.ModelAdmin):
     list_display = ['student_name', 'quiz_title', 'score_display', 'submitted_date']
-    list_filter = ['quiz__course', 'submitted_date', 'student', 'quiz']
+    list_select_related = ('student', 'quiz')
+    list_defer = ('quiz__description',)
+    list_filter = ['quiz__course', 'submitted_date', 'student', ('quiz', CourseItemListFilter)]
     search_fields = ['student__email', 'student__username', 'student__first_name', 'student__last_name', 'quiz__title']
+    autocomplete_fields = ['student', 'quiz']
     date_hierarchy = 'submitted_date'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(student_full_name=full_name('student'))
+
     @admin.display(description='Student', ordering='student__first_name')
     def student_name(self, obj):
-        return obj.student.get_full_name() or obj.student.username
+        return obj.student_full_name.strip() or obj.student.username
 
     @admin.display(description='Quiz', ordering='quiz__title')
     def quiz_title(self, obj):
@@ -332,48 +478,59 @@ class QuizScoreAdmin(CSVUploadMixin, admin.ModelAdmin):
         'STU002,CS101,Quiz 1,38,graded'
     )
 
-    def process_csv_rows(self, rows):
-        required = {'student_id', 'course_code', 'quiz_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return 0, 0, [f'Missing columns: {", ".join(missing)}']
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self.get_student(row['student_id'].strip())
+    csv_required_columns = frozenset({'student_id', 'course_code', 'quiz_title', 'score'})
+
+    def process_csv_rows(self, rows, columns, start=2):
+        student_col, course_col = columns['student_id'], columns['course_code']
+        students = self.get_students(rows, columns)
+        courses = self.get_courses(rows, columns)
+        title_col, score_col = columns['quiz_title'], columns['score']
+        quizzes = self.get_course_items(Quiz, courses, rows, title_col)
+        row_status = csv_column(columns, 'status', 'graded')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col])
             if not student:
-                errors.append(f'Row {i}: student_id "{row["student_id"]}" not found.')
+                errors.append(f'Row {i}: student_id "{row[student_col]}" not found.')
                 continue
 
-            course = self.get_course(row['course_code'].strip())
+            course = courses.get(row[course_col])
             if not course:
-                errors.append(f'Row {i}: course_code "{row["course_code"]}" not found.')
+                errors.append(f'Row {i}: course_code "{row[course_col]}" not found.')
+                continue
+
+            quiz = quizzes.get((course.course_id, row[title_col]))
+            if not quiz:
+                errors.append(f'Row {i}: quiz "{row[title_col]}" not found in {course.course_code}.')
                 continue
 
             try:
-                quiz = Quiz.objects.get(course=course, title=row['quiz_title'].strip())
-            except Quiz.DoesNotExist:
-                errors.append(f'Row {i}: quiz "{row["quiz_title"]}" not found in {course.course_code}.')
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
                 continue
 
-            row_status = row.get('status', 'graded').strip() or 'graded'
-            obj, was_created = QuizScore.objects.update_or_create(
+            objs.append(QuizScore(
                 quiz=quiz,
                 student=student,
-                defaults={
-                    'score': float(row['score']),
-                    'status': row_status,
-                },
-            )
-            created += was_created
-            updated += not was_created
-
+                score=score,
+                status=row_status(row) or 'graded',
+            ))
+
+        created, updated = upsert_rows(
+            QuizScore, objs,
+            unique_fields=['quiz', 'student'],
+            update_fields=['score', 'status'],
+        )
+        refresh_assessment_rows(objs, 'quiz')
         return created, updated, errors
 
 
 @admin.register(LabActivity)
-class LabActivityAdmin(admin.ModelAdmin):
+class LabActivityAdmin(ListDeferMixin, admin.ModelAdmin):
     list_display = ['title', 'course_code', 'teacher_name', 'date', 'max_score', 'week_number']
+    list_select_related = ('course', 'teacher')
+    list_defer = ('course__description',)
     list_filter = ['course', 'week_number', 'date']
     search_fields = ['title', 'course__course_code', 'teacher__username']
     date_hierarchy = 'date'
@@ -382,21 +539,29 @@ class LabActivityAdmin(admin.ModelAdmin):
     def course_code(self, obj):
         return obj.course.course_code
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(teacher_full_name=full_name('teacher'))
+
     @admin.display(description='Teacher', ordering='teacher__first_name')
     def teacher_name(self, obj):
-        return obj.teacher.get_full_name() or obj.teacher.username
+        return obj.teacher_full_name.strip() or obj.teacher.username
 
 
 @admin.register(LabParticipation)
 class LabParticipationAdmin(CSVUploadMixin, admin.ModelAdmin):
     list_display = ['student_name', 'lab_title', 'date', 'score_display', 'max_score', 'attendance_badge']
+    list_select_related = ('student', 'lab')
     list_filter = ['attendance', 'date', 'lab__course']
     search_fields = ['student__email', 'student__username', 'student__first_name', 'student__last_name', 'lab__title']
+    autocomplete_fields = ['student', 'lab']
     date_hierarchy = 'date'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(student_full_name=full_name('student'))
+
     @admin.display(description='Student', ordering='student__first_name')
     def student_name(self, obj):
-        return obj.student.get_full_name() or obj.student.username
+        return obj.student_full_name.strip() or obj.student.username
 
     @admin.display(description='Lab', ordering='lab__title')
     def lab_title(self, obj):
@@ -413,13 +578,7 @@ class LabParticipationAdmin(CSVUploadMixin, admin.ModelAdmin):
 
     @admin.display(description='Attended', ordering='attendance')
     def attendance_badge(self, obj):
-        if obj.attendance:
-            return format_html(
-                '<span style="background:#D1FAE5; color:#065F46; padding:3px 10px; border-radius:12px; font-size:11px; font-weight:700;">Yes</span>'
-            )
-        return format_html(
-            '<span style="background:#FEE2E2; color:#991B1B; padding:3px 10px; border-radius:12px; font-size:11px; font-weight:700;">No</span>'
-        )
+        return LAB_ATTENDANCE_BADGES[bool(obj.attendance)]
 
     csv_expected_columns = 'student_id, course_code, lab_title, date, score, max_score, attendance, remark'
     csv_example = (
@@ -428,51 +587,69 @@ class LabParticipationAdmin(CSVUploadMixin, admin.ModelAdmin):
         'STU002,CS101,Lab 1,2026-02-20,75,100,true,'
     )
 
-    def process_csv_rows(self, rows):
-        required = {'student_id', 'course_code', 'lab_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return 0, 0, [f'Missing columns: {", ".join(missing)}']
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self.get_student(row['student_id'].strip())
+    csv_required_columns = frozenset({'student_id', 'course_code', 'lab_title', 'score'})
+
+    def process_csv_rows(self, rows, columns, start=2):
+        student_col, course_col = columns['student_id'], columns['course_code']
+        students = self.get_students(rows, columns)
+        courses = self.get_courses(rows, columns)
+        title_col, score_col = columns['lab_title'], columns['score']
+        labs = self.get_course_items(LabActivity, courses, rows, title_col)
+        row_max_score = csv_column(columns, 'max_score', None)
+        row_attendance = csv_column(columns, 'attendance', 'true')
+        row_remark = csv_column(columns, 'remark')
+        row_date = csv_column(columns, 'date')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col])
             if not student:
-                errors.append(f'Row {i}: student_id "{row["student_id"]}" not found.')
+                errors.append(f'Row {i}: student_id "{row[student_col]}" not found.')
                 continue
 
-            course = self.get_course(row['course_code'].strip())
+            course = courses.get(row[course_col])
             if not course:
-                errors.append(f'Row {i}: course_code "{row["course_code"]}" not found.')
+                errors.append(f'Row {i}: course_code "{row[course_col]}" not found.')
+                continue
+
+            lab = labs.get((course.course_id, row[title_col]))
+            if not lab:
+                errors.append(f'Row {i}: lab "{row[title_col]}" not found in {course.course_code}.')
+                continue
+
+            try:
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
                 continue
 
             try:
-                lab = LabActivity.objects.get(course=course, title=row['lab_title'].strip())
-            except LabActivity.DoesNotExist:
-                errors.append(f'Row {i}: lab "{row["lab_title"]}" not found in {course.course_code}.')
+                max_score = float(row_max_score(row) or lab.max_score)
+            except ValueError:
+                errors.append(f'Row {i}: invalid max_score "{row_max_score(row)}" (expected a number).')
                 continue
 
             defaults = {
-                'score': float(row['score']),
-                'max_score': float(row.get('max_score', lab.max_score) or lab.max_score),
-                'attendance': row.get('attendance', 'true').strip().lower() in ('true', '1', 'yes'),
-                'remark': row.get('remark', '').strip(),
+                'score': score,
+                'max_score': max_score,
+                'attendance': row_attendance(row).lower() in CSV_TRUE_VALUES,
+                'remark': row_remark(row),
             }
-            if row.get('date', '').strip():
+            date_text = row_date(row)
+            if date_text:
                 try:
-                    defaults['date'] = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+                    defaults['date'] = parse_csv_date(date_text)
                 except ValueError:
-                    errors.append(f'Row {i}: invalid date "{row["date"]}" (expected YYYY-MM-DD).')
+                    errors.append(f'Row {i}: invalid date "{date_text}" (expected YYYY-MM-DD).')
                     continue
             else:
                 defaults['date'] = lab.date
 
-            obj, was_created = LabParticipation.objects.update_or_create(
-                lab=lab,
-                student=student,
-                defaults=defaults,
-            )
-            created += was_created
-            updated += not was_created
+            objs.append(LabParticipation(lab=lab, student=student, **defaults))
 
+        created, updated = upsert_rows(
+            LabParticipation, objs,
+            unique_fields=['lab', 'student'],
+            update_fields=['score', 'max_score', 'attendance', 'remark', 'date'],
+        )
+        invalidate_dashboard((obj.student_id, obj.lab.course_id) for obj in objs)
         return created, updated, errors
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-14 03:52
+
+from django.db import migrations, models
+
+
+def _percentage(max_score_field):
+    return models.Case(
+        models.When(**{f'{max_score_field}__gt': 0}, then=models.F('score') / models.F(max_score_field) * 100.0),
+        default=models.Value(0.0),
+        output_field=models.FloatField()
+    )
+
+
+def backfill_weekly_progress(apps, schema_editor):
+    """Populate WeeklyProgress from the existing submissions and quiz scores"""
+    AssignmentSubmission = apps.get_model('assessments', 'AssignmentSubmission')
+    QuizScore = apps.get_model('assessments', 'QuizScore')
+    WeeklyProgress = apps.get_model('assessments', 'WeeklyProgress')
+
+    assignment_rows = AssignmentSubmission.objects.filter(score__isnull=False).exclude(
+        status='missing'
+    ).values(
+        'student_id', course=models.F('assignment__course_id'), week=models.F('assignment__week_number')
+    ).annotate(
+        total=models.Sum(_percentage('assignment__max_score')), count=models.Count('submission_id')
+    ).order_by()
+    quiz_rows = QuizScore.objects.values(
+        'student_id', course=models.F('quiz__course_id'), week=models.F('quiz__week_number')
+    ).annotate(
+        total=models.Sum(_percentage('quiz__max_score')), count=models.Count('quiz_score_id')
+    ).order_by()
+
+    buckets = {}
+    for rows in (assignment_rows, quiz_rows):
+        for row in rows:
+            key = (row['student_id'], row['course'], row['week'])
+            total, count = buckets.get(key, (0.0, 0))
+            buckets[key] = (total + (row['total'] or 0), count + row['count'])
+
+    WeeklyProgress.objects.all().delete()
+    WeeklyProgress.objects.bulk_create([
+        WeeklyProgress(student_id=student_id, course_id=course_id, week_number=week, student_score=total / count)
+        for (student_id, course_id, week), (total, count) in buckets.items()
+        if count
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0005_quiz_status_quizscore_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='weeklyprogress',
+            name='class_average',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_weekly_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-14 04:05
+"""
+Make (item, student) unique on submissions, quiz scores and lab participation.
+
+Duplicate rows are deleted first, keeping the newest one per pair. This is not reversible:
+rolling the migration back only drops the constraints, it does not restore the deleted rows.
+Back up the database before applying it where duplicates may exist.
+"""
+
+import importlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+backfill_weekly_progress = importlib.import_module(
+    'apps.assessments.migrations.0006_weeklyprogress_backfill'
+).backfill_weekly_progress
+
+
+def drop_duplicate_rows(apps, schema_editor):
+    """
+    Keep the newest row per (item, student) so the unique constraints can be added;
+    prints how many rows were deleted per model, since nothing else records them
+    """
+    for model_name, item_field in (
+        ('AssignmentSubmission', 'assignment'),
+        ('QuizScore', 'quiz'),
+        ('LabParticipation', 'lab'),
+    ):
+        model = apps.get_model('assessments', model_name)
+        pk_name = model._meta.pk.name
+        duplicates = model.objects.values(item_field, 'student').annotate(
+            rows=models.Count(pk_name), keep=models.Max(pk_name)
+        ).filter(rows__gt=1).order_by()
+        deleted = 0
+        for group in duplicates:
+            deleted += model.objects.filter(
+                **{item_field: group[item_field], 'student': group['student']}
+            ).exclude(pk=group['keep']).delete()[0]
+        print(f'\n  {model_name}: deleted {deleted} duplicate row(s)', end='')
+
+    # Submission and quiz duplicates were counted in the stored week scores
+    backfill_weekly_progress(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('assessments', '0006_weeklyprogress_backfill'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_rows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='assignmentsubmission',
+            unique_together={('assignment', 'student')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='labparticipation',
+            unique_together={('lab', 'student')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizscore',
+            unique_together={('quiz', 'student')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-14 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0007_unique_assessment_rows'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['course', 'week_number'], name='assignments_course__fddbc7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['course', 'week_number'], name='quizzes_course__50bc03_idx'),
+        ),
+    ]
@@ -8,7 +8,7 @@ from ..courses.models import Course
 
 # apps/assessments/models.py
 
-from django.db import models
+from django.db import models, transaction
 from apps.users.models import User
 from apps.courses.models import Course
 
@@ -47,6 +47,7 @@ class Assignment(models.Model):
     
     class Meta:
         db_table = 'assignments'
+        indexes = [models.Index(fields=['course', 'week_number'])]
     
     def __str__(self):
         return f"{self.title} - {self.course.course_code}"
@@ -66,6 +67,7 @@ choices=[
     ])
     class Meta:
         db_table = 'assignment_submissions'
+        unique_together = ('assignment', 'student')
     
     def __str__(self):
         return f"{self.student.username} - {self.assignment.title}"
@@ -88,6 +90,7 @@ choices=[
     
     class Meta:
         db_table = 'quizzes'
+        indexes = [models.Index(fields=['course', 'week_number'])]
     
     def __str__(self):
         return f"{self.title} - {self.course.course_code}"
@@ -108,6 +111,7 @@ class QuizScore(models.Model):
     
     class Meta:
         db_table = 'quiz_scores'
+        unique_together = ('quiz', 'student')
     
     def __str__(self):
         return f"{self.student.username} - {self.quiz.title}"
@@ -145,22 +149,98 @@ class LabParticipation(models.Model):
     
     class Meta:
         db_table = 'lab_participation'
+        unique_together = ('lab', 'student')
     
     def __str__(self):
         return f"{self.student.username} - {self.lab.title}"
 
 # ===================== WEEKLY PROGRESS =====================
 
+def _percentage(max_score_field):
+    """score / max_score * 100, or 0 when max_score is not positive"""
+    return models.Case(
+        models.When(**{f'{max_score_field}__gt': 0}, then=models.F('score') / models.F(max_score_field) * 100.0),
+        default=models.Value(0.0),
+        output_field=models.FloatField()
+    )
+
+
 class WeeklyProgress(models.Model):
-    """Track weekly progress for charts"""
+    """
+    Track weekly progress for charts
+    
+    One row per (student, course, week) with graded work. student_score is the mean
+    percentage over that week's assignment submissions and quiz scores. Rows are kept
+    current by apps/assessments/signals.py; writes that skip signals (bulk_create,
+    queryset.update) must call refresh() themselves.
+    """
     progress_id = models.AutoField(primary_key=True)
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     week_number = models.IntegerField()
     student_score = models.FloatField()
-    class_average = models.FloatField()
+    class_average = models.FloatField(null=True, blank=True)
     calculated_date = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'weekly_progress'
-        unique_together = ('student', 'course', 'week_number')
\ No newline at end of file
+        unique_together = ('student', 'course', 'week_number')
+    
+    @staticmethod
+    def compute_scores(course_id, student_ids=None, week_numbers=None):
+        """
+        {(student_id, week_number): mean item percentage} from the raw assessment rows,
+        one GROUP BY query per source
+        """
+        assignment_filter = {'assignment__course_id': course_id}
+        quiz_filter = {'quiz__course_id': course_id}
+        if student_ids is not None:
+            assignment_filter['student_id__in'] = quiz_filter['student_id__in'] = student_ids
+        if week_numbers is not None:
+            assignment_filter['assignment__week_number__in'] = week_numbers
+            quiz_filter['quiz__week_number__in'] = week_numbers
+        
+        assignment_rows = AssignmentSubmission.objects.filter(
+            score__isnull=False, **assignment_filter
+        ).exclude(status='missing').values(
+            'student_id', week=models.F('assignment__week_number')
+        ).annotate(
+            total=models.Sum(_percentage('assignment__max_score')),
+            count=models.Count('submission_id')
+        ).order_by()
+        
+        quiz_rows = QuizScore.objects.filter(**quiz_filter).values(
+            'student_id', week=models.F('quiz__week_number')
+        ).annotate(
+            total=models.Sum(_percentage('quiz__max_score')),
+            count=models.Count('quiz_score_id')
+        ).order_by()
+        
+        # Single-pass querysets: stream them instead of filling the result cache,
+        # a course-wide refresh can cover every student-week of the course
+        buckets = {}
+        for rows in (assignment_rows, quiz_rows):
+            for row in rows.iterator(chunk_size=1000):
+                key = (row['student_id'], row['week'])
+                total, count = buckets.get(key, (0.0, 0))
+                buckets[key] = (total + (row['total'] or 0), count + row['count'])
+        
+        return {key: total / count for key, (total, count) in buckets.items() if count}
+    
+    @classmethod
+    def refresh(cls, course_id, student_ids=None, week_numbers=None):
+        """Recompute stored rows for a course, optionally limited to some students/weeks"""
+        scores = cls.compute_scores(course_id, student_ids, week_numbers)
+        
+        stale = cls.objects.filter(course_id=course_id)
+        if student_ids is not None:
+            stale = stale.filter(student_id__in=student_ids)
+        if week_numbers is not None:
+            stale = stale.filter(week_number__in=week_numbers)
+        
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create([
+                cls(student_id=student_id, course_id=course_id, week_number=week, student_score=score)
+                for (student_id, week), score in scores.items()
+            ])
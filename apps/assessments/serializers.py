@@ -19,33 +19,32 @@ class AssignmentSerializer(serializers.ModelSerializer):
             'score'
         ]
     
-    def get_submission_status(self, obj):
-        """Get submission status for current student"""
+    def _submission(self, obj):
+        """
+        Current student's submission for obj, looked up in context['submissions']
+        ({assignment_id: submission}). Views may pass it in; otherwise it is
+        filled with one query on first use and shared by the remaining objects
+        """
+        submissions = self.context.get('submissions')
+        if submissions is not None:
+            return submissions.get(obj.assignment_id)
         request = self.context.get('request')
         if request and request.user:
-            try:
-                submission = AssignmentSubmission.objects.get(
-                    assignment=obj,
-                    student=request.user
-                )
-                return submission.status 
-            except AssignmentSubmission.DoesNotExist:
-                return 'not_submitted'
-        return 'not_submitted'
+            submissions = self.context['submissions'] = {
+                row.assignment_id: row for row in AssignmentSubmission.objects.filter(student=request.user)
+            }
+            return submissions.get(obj.assignment_id)
+        return None
+    
+    def get_submission_status(self, obj):
+        """Get submission status for current student"""
+        submission = self._submission(obj)
+        return submission.status if submission is not None else 'not_submitted'
     
     def get_score(self, obj):
         """Get score for current student"""
-        request = self.context.get('request')
-        if request and request.user:
-            try:
-                submission = AssignmentSubmission.objects.get(
-                    assignment=obj,
-                    student=request.user
-                )
-                return submission.score
-            except AssignmentSubmission.DoesNotExist:
-                return None
-        return None
+        submission = self._submission(obj)
+        return submission.score if submission is not None else None
 
 
 class QuizSerializer(serializers.ModelSerializer):
@@ -66,30 +65,29 @@ class QuizSerializer(serializers.ModelSerializer):
             'score'
         ]
     
-    def get_submission_status(self, obj):
-        """Get submission status for current student"""
+    def _quiz_score(self, obj):
+        """
+        Current student's score for obj, looked up in context['quiz_scores']
+        ({quiz_id: quiz_score}). Views may pass it in; otherwise it is
+        filled with one query on first use and shared by the remaining objects
+        """
+        quiz_scores = self.context.get('quiz_scores')
+        if quiz_scores is not None:
+            return quiz_scores.get(obj.quiz_id)
         request = self.context.get('request')
         if request and request.user:
-            try:
-                quiz_score = QuizScore.objects.get(
-                    quiz=obj,
-                    student=request.user
-                )
-                return quiz_score.status
-            except QuizScore.DoesNotExist:
-                return 'not_taken'
-        return 'not_taken'
+            quiz_scores = self.context['quiz_scores'] = {
+                row.quiz_id: row for row in QuizScore.objects.filter(student=request.user)
+            }
+            return quiz_scores.get(obj.quiz_id)
+        return None
+    
+    def get_submission_status(self, obj):
+        """Get submission status for current student"""
+        quiz_score = self._quiz_score(obj)
+        return quiz_score.status if quiz_score is not None else 'not_taken'
     
     def get_score(self, obj):
         """Get score for current student"""
-        request = self.context.get('request')
-        if request and request.user:
-            try:
-                quiz_score = QuizScore.objects.get(
-                    quiz=obj,
-                    student=request.user
-                )
-                return quiz_score.score
-            except QuizScore.DoesNotExist:
-                return None
-        return None
\ No newline at end of file
+        quiz_score = self._quiz_score(obj)
+        return quiz_score.score if quiz_score is not None else None
\ No newline at end of file
@@ -0,0 +1,136 @@
+# apps/assessments/signals.py - keep WeeklyProgress and cached analytics in sync with the rows they are built from
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.analytics.cache import invalidate_class_weekly, invalidate_course_info, invalidate_dashboard
+from apps.courses.cache import invalidate_enrolment
+from apps.courses.models import Course, CourseRegistration, CourseTeaching
+from apps.users.models import User
+from .models import (
+    Attendance, Assignment, AssignmentSubmission,
+    Quiz, QuizScore, LabParticipation, WeeklyProgress,
+)
+from .utils import refresh_course_assessments
+
+
+def _is_cascade(instance, origin):
+    """
+    True when the row is being removed as part of deleting a parent (course, student,
+    assessment). The parent's own handler, or the cascade itself, covers WeeklyProgress.
+    """
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not type(instance)
+
+
+# An edit can move a row to another student, course or assessment (the admin allows it), so
+# the stored values are read before the save and both the old and new keys are refreshed
+
+def _stored_values(instance, *fields):
+    """fields of the row as currently stored, or None for a row being inserted"""
+    if instance._state.adding:
+        return None
+    return type(instance)._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _refresh_progress(keys):
+    """Refresh WeeklyProgress and drop the caches built on it for (course_id, student_id, week) keys"""
+    keys = {key for key in keys if key is not None}
+    for course_id, student_id, week_number in keys:
+        WeeklyProgress.refresh(course_id, [student_id], [week_number])
+    invalidate_dashboard((student_id, course_id) for course_id, student_id, _ in keys)
+    invalidate_class_weekly(course_id for course_id, _, _ in keys)
+
+
+@receiver(pre_save, sender=Attendance)
+def attendance_saving(sender, instance, **kwargs):
+    instance._stored_key = _stored_values(instance, 'student_id', 'course_id')
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    invalidate_dashboard(filter(None, [
+        (instance.student_id, instance.course_id), instance.__dict__.pop('_stored_key', None),
+    ]))
+
+
+@receiver(pre_save, sender=AssignmentSubmission)
+def assignment_submission_saving(sender, instance, **kwargs):
+    instance._stored_key = _stored_values(
+        instance, 'assignment__course_id', 'student_id', 'assignment__week_number'
+    )
+
+
+@receiver([post_save, post_delete], sender=AssignmentSubmission)
+def assignment_submission_changed(sender, instance, origin=None, **kwargs):
+    stored_key = instance.__dict__.pop('_stored_key', None)
+    if _is_cascade(instance, origin):
+        return
+    assignment = instance.assignment
+    _refresh_progress([(assignment.course_id, instance.student_id, assignment.week_number), stored_key])
+
+
+@receiver(pre_save, sender=QuizScore)
+def quiz_score_saving(sender, instance, **kwargs):
+    instance._stored_key = _stored_values(instance, 'quiz__course_id', 'student_id', 'quiz__week_number')
+
+
+@receiver([post_save, post_delete], sender=QuizScore)
+def quiz_score_changed(sender, instance, origin=None, **kwargs):
+    stored_key = instance.__dict__.pop('_stored_key', None)
+    if _is_cascade(instance, origin):
+        return
+    quiz = instance.quiz
+    _refresh_progress([(quiz.course_id, instance.student_id, quiz.week_number), stored_key])
+
+
+@receiver(pre_save, sender=LabParticipation)
+def lab_participation_saving(sender, instance, **kwargs):
+    instance._stored_key = _stored_values(instance, 'student_id', 'lab__course_id')
+
+
+@receiver([post_save, post_delete], sender=LabParticipation)
+def lab_participation_changed(sender, instance, **kwargs):
+    invalidate_dashboard(filter(None, [
+        (instance.student_id, instance.lab.course_id), instance.__dict__.pop('_stored_key', None),
+    ]))
+
+
+# max_score / week_number edits move every student's weekly score and dashboard in the course
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=Quiz)
+def assessment_changed(sender, instance, origin=None, **kwargs):
+    if _is_cascade(instance, origin):
+        return
+    refresh_course_assessments(instance.course_id)
+
+
+# Enrolment changes the set of students averaged and the student's access checks
+@receiver([post_save, post_delete], sender=CourseRegistration)
+def registration_changed(sender, instance, **kwargs):
+    invalidate_class_weekly([instance.course_id])
+    invalidate_enrolment([(instance.student_id, instance.course_id)])
+
+
+# Dashboard header: course fields and the teacher's name
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_course_info([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=CourseTeaching)
+def teaching_changed(sender, instance, **kwargs):
+    invalidate_course_info([instance.course_id])
+
+
+@receiver(post_save, sender=User)
+def teacher_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login
+    if instance.user_type != 'teacher' or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_course_info(
+        CourseTeaching.objects.filter(teacher=instance).values_list('course_id', flat=True)
+    )
@@ -0,0 +1,92 @@
+# apps/assessments/utils.py - helpers shared by the CSV importers
+
+import operator
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import transaction
+
+from apps.courses.models import CourseRegistration
+from .models import WeeklyProgress
+from ..analytics.cache import invalidate_class_weekly, invalidate_dashboard
+
+# Cell values read as True in boolean columns (compared lower-cased)
+CSV_TRUE_VALUES = frozenset({'true', '1', 'yes'})
+
+
+def csv_column(columns, name, default=''):
+    """Cell getter for an optional column; reads as default when the header lacks it"""
+    if name in columns:
+        return operator.itemgetter(columns[name])
+    return lambda row: default
+
+
+def parse_csv_date(value):
+    """
+    YYYY-MM-DD to a date, raising ValueError otherwise. Dates already in that
+    shape take the C fromisoformat path; anything else goes through strptime,
+    so the accepted inputs are exactly those of '%Y-%m-%d'.
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-' and value[:4].isdigit():
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def upsert_rows(model, objs, unique_fields, update_fields):
+    """
+    Insert-or-update the parsed rows with one INSERT ... ON CONFLICT per batch.
+    Later rows with the same unique key win, as with per-row update_or_create.
+    Returns (created, updated) counted per CSV row.
+    """
+    key_attnames = [model._meta.get_field(name).attname for name in unique_fields]
+    pending = {}
+    for obj in objs:
+        pending[tuple(getattr(obj, attname) for attname in key_attnames)] = obj
+    if not pending:
+        return 0, 0
+
+    # Superset of the existing keys: each key column IN the uploaded values
+    existing = set(model.objects.filter(**{
+        f'{attname}__in': {key[i] for key in pending} for i, attname in enumerate(key_attnames)
+    }).values_list(*key_attnames))
+    created = sum(key not in existing for key in pending)
+
+    with transaction.atomic():
+        model.objects.bulk_create(
+            list(pending.values()),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+    return created, len(objs) - created
+
+
+def refresh_assessment_rows(objs, item_field):
+    """bulk_create skips the assessment signals; refresh what they would have"""
+    affected = defaultdict(lambda: (set(), set()))
+    for obj in objs:
+        item = getattr(obj, item_field)
+        student_ids, weeks = affected[item.course_id]
+        student_ids.add(obj.student_id)
+        weeks.add(item.week_number)
+    for course_id, (student_ids, weeks) in affected.items():
+        WeeklyProgress.refresh(course_id, list(student_ids), list(weeks))
+    invalidate_dashboard((obj.student_id, getattr(obj, item_field).course_id) for obj in objs)
+    invalidate_class_weekly(affected)
+
+
+def refresh_course_assessments(course_id):
+    """
+    A course's assignment/quiz set or max_score/week_number changed: rebuild its
+    WeeklyProgress and drop the class averages and every enrolled student's dashboard,
+    whose possible totals, week scores and risk all move with it
+    """
+    WeeklyProgress.refresh(course_id)
+    invalidate_class_weekly([course_id])
+    invalidate_dashboard(
+        CourseRegistration.objects.filter(course_id=course_id).values_list('student_id', 'course_id')
+    )
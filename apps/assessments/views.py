@@ -1,25 +1,45 @@
 import csv
 import io
-from datetime import datetime
+import itertools
 
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 
+from apps.analytics.cache import invalidate_dashboard
 from apps.users.models import User
 from apps.courses.models import Course
 from .models import (
     Attendance, Assignment, AssignmentSubmission,
     Quiz, QuizScore, LabActivity, LabParticipation,
 )
+from .utils import CSV_TRUE_VALUES, csv_column, parse_csv_date, refresh_assessment_rows, upsert_rows
 
 
 class CSVUploadView(APIView):
     parser_classes = [MultiPartParser]
     permission_classes = [IsAuthenticated]
 
+    # Per upload type: required columns and the label used in the response message
+    required_columns = {
+        'attendance': frozenset({'student_id', 'date', 'week_number', 'status', 'section'}),
+        'assignment_scores': frozenset({'student_id', 'assignment_title', 'score'}),
+        'quiz_scores': frozenset({'student_id', 'quiz_title', 'score'}),
+        'lab_scores': frozenset({'student_id', 'lab_title', 'score'}),
+    }
+    upload_labels = {
+        'attendance': 'Attendance',
+        'assignment_scores': 'Assignment scores',
+        'quiz_scores': 'Quiz scores',
+        'lab_scores': 'Lab scores',
+    }
+
+    # Rows parsed, resolved and written per round of queries
+    batch_size = 1000
+
     def post(self, request):
         csv_file = request.FILES.get('file')
         data_type = request.data.get('type')  # attendance, assignment_scores, quiz_scores, lab_scores
@@ -39,14 +59,16 @@ class CSVUploadView(APIView):
         except Course.DoesNotExist:
             return Response({'error': f'Course {course_code} not found.'}, status=status.HTTP_404_NOT_FOUND)
 
+        # Decode and parse as the rows are consumed; only one batch is held in memory
+        reader = csv.reader(io.TextIOWrapper(csv_file, encoding='utf-8', newline=''))
         try:
-            decoded = csv_file.read().decode('utf-8')
-            reader = csv.DictReader(io.StringIO(decoded))
-            rows = list(reader)
-        except Exception as e:
+            fieldnames = next(reader, [])
+            rows = (row for row in reader if row)  # blank lines are skipped, as DictReader does
+            first_row = next(rows, None)
+        except (UnicodeDecodeError, csv.Error) as e:
             return Response({'error': f'Failed to parse CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not rows:
+        if first_row is None:
             return Response({'error': 'CSV file is empty.'}, status=status.HTTP_400_BAD_REQUEST)
 
         handler = {
@@ -62,15 +84,59 @@ class CSVUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        return handler(rows, course)
+        # Rows are plain lists read through {column name: index}; short rows are padded
+        columns = {name: i for i, name in enumerate(fieldnames)}
+        missing = self.required_columns[data_type] - columns.keys()
+        if missing:
+            return Response({'error': f'Missing columns: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-    def _get_student(self, student_id):
+        created, updated, errors = 0, 0, []
+        line = 2  # first data row, after the header
+        width = len(fieldnames)
+        rows = (row + [''] * (width - len(row)) for row in itertools.chain([first_row], rows))
+        batches = iter(lambda: list(itertools.islice(rows, self.batch_size)), [])
         try:
-            return User.objects.get(student_id=student_id, user_type='student')
-        except User.DoesNotExist:
-            return None
+            # One transaction per upload: rows with errors are skipped and reported while the rest
+            # are committed; only an exception part-way through rolls the whole upload back
+            with transaction.atomic():
+                for batch in batches:
+                    batch_created, batch_updated, batch_errors = handler(batch, columns, course, start=line)
+                    created += batch_created
+                    updated += batch_updated
+                    errors.extend(batch_errors)
+                    line += len(batch)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Failed to parse CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': f'{self.upload_labels[data_type]} upload complete. Created: {created}, Updated: {updated}.',
+            'errors': errors,
+        })
 
-    def _handle_attendance(self, rows, course):
+    # Lookups for a batch, one query each, so rows resolve against dicts
+
+    @staticmethod
+    def _get_students(rows, columns):
+        """{student_id: student} for every student_id in the batch"""
+        col = columns['student_id']
+        student_ids = {row[col].strip() for row in rows}
+        return {
+            student.student_id: student
+            for student in User.objects.filter(student_id__in=student_ids, user_type='student')
+        }
+
+    @staticmethod
+    def _get_course_items(model, course, rows, col):
+        """{title: item} for the assignments/quizzes/labs of course named in the batch, col being the title index"""
+        titles = {row[col].strip() for row in rows}
+        items = model.objects.filter(course=course, title__in=titles).order_by('-pk')
+        # Keep the oldest row when the course reuses a title
+        return {item.title: item for item in items}
+
+    # Handlers take one batch of rows, numbered from start, and return (created, updated, errors);
+    # columns maps header names to row indexes
+
+    def _handle_attendance(self, rows, columns, course, start=2):
         """
         Expected CSV columns: student_id, date, week_number, status, section
         - student_id: the student's student_id field
@@ -79,170 +145,190 @@ class CSVUploadView(APIView):
         - status: present or absent
         - section: first-section, second-section, third-section, fourth-section
         """
-        required = {'student_id', 'date', 'week_number', 'status', 'section'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return Response({'error': f'Missing columns: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):  # row 2 in CSV (after header)
-            student = self._get_student(row['student_id'].strip())
+        student_col = columns['student_id']
+        students = self._get_students(rows, columns)
+        date_col, section_col = columns['date'], columns['section']
+        week_col, status_col = columns['week_number'], columns['status']
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col].strip())
             if not student:
-                errors.append(f'Row {i}: student_id {row["student_id"]} not found.')
+                errors.append(f'Row {i}: student_id {row[student_col]} not found.')
                 continue
 
             try:
-                date = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+                date = parse_csv_date(row[date_col].strip())
             except ValueError:
                 errors.append(f'Row {i}: invalid date format (expected YYYY-MM-DD).')
                 continue
 
-            obj, was_created = Attendance.objects.update_or_create(
+            try:
+                week_number = int(row[week_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid week_number "{row[week_col]}" (expected a whole number).')
+                continue
+
+            objs.append(Attendance(
                 student=student,
                 course=course,
                 date=date,
-                section=row['section'].strip(),
-                defaults={
-                    'week_number': int(row['week_number']),
-                    'status': row['status'].strip(),
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
-        return Response({
-            'message': f'Attendance upload complete. Created: {created}, Updated: {updated}.',
-            'errors': errors,
-        })
-
-    def _handle_assignment_scores(self, rows, course):
+                section=row[section_col].strip(),
+                week_number=week_number,
+                status=row[status_col].strip(),
+            ))
+
+        created, updated = upsert_rows(
+            Attendance, objs,
+            unique_fields=['student', 'course', 'date', 'section'],
+            update_fields=['week_number', 'status'],
+        )
+        invalidate_dashboard((obj.student_id, course.course_id) for obj in objs)
+        return created, updated, errors
+
+    def _handle_assignment_scores(self, rows, columns, course, start=2):
         """
         Expected CSV columns: student_id, assignment_title, score, status
         """
-        required = {'student_id', 'assignment_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return Response({'error': f'Missing columns: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self._get_student(row['student_id'].strip())
+        student_col = columns['student_id']
+        students = self._get_students(rows, columns)
+        title_col, score_col = columns['assignment_title'], columns['score']
+        assignments = self._get_course_items(Assignment, course, rows, title_col)
+        row_status = csv_column(columns, 'status', 'graded')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col].strip())
             if not student:
-                errors.append(f'Row {i}: student_id {row["student_id"]} not found.')
+                errors.append(f'Row {i}: student_id {row[student_col]} not found.')
+                continue
+
+            assignment = assignments.get(row[title_col].strip())
+            if not assignment:
+                errors.append(f'Row {i}: assignment "{row[title_col]}" not found in course.')
                 continue
 
             try:
-                assignment = Assignment.objects.get(course=course, title=row['assignment_title'].strip())
-            except Assignment.DoesNotExist:
-                errors.append(f'Row {i}: assignment "{row["assignment_title"]}" not found in course.')
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
                 continue
 
-            row_status = row.get('status', 'graded').strip() or 'graded'
-            obj, was_created = AssignmentSubmission.objects.update_or_create(
+            status_text = row_status(row).strip() or 'graded'
+            objs.append(AssignmentSubmission(
                 assignment=assignment,
                 student=student,
-                defaults={
-                    'score': float(row['score']),
-                    'status': row_status,
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
-        return Response({
-            'message': f'Assignment scores upload complete. Created: {created}, Updated: {updated}.',
-            'errors': errors,
-        })
-
-    def _handle_quiz_scores(self, rows, course):
+                score=score,
+                status=status_text,
+            ))
+
+        created, updated = upsert_rows(
+            AssignmentSubmission, objs,
+            unique_fields=['assignment', 'student'],
+            update_fields=['score', 'status'],
+        )
+        refresh_assessment_rows(objs, 'assignment')
+        return created, updated, errors
+
+    def _handle_quiz_scores(self, rows, columns, course, start=2):
         """
         Expected CSV columns: student_id, quiz_title, score, status
         """
-        required = {'student_id', 'quiz_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return Response({'error': f'Missing columns: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self._get_student(row['student_id'].strip())
+        student_col = columns['student_id']
+        students = self._get_students(rows, columns)
+        title_col, score_col = columns['quiz_title'], columns['score']
+        quizzes = self._get_course_items(Quiz, course, rows, title_col)
+        row_status = csv_column(columns, 'status', 'graded')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col].strip())
             if not student:
-                errors.append(f'Row {i}: student_id {row["student_id"]} not found.')
+                errors.append(f'Row {i}: student_id {row[student_col]} not found.')
+                continue
+
+            quiz = quizzes.get(row[title_col].strip())
+            if not quiz:
+                errors.append(f'Row {i}: quiz "{row[title_col]}" not found in course.')
                 continue
 
             try:
-                quiz = Quiz.objects.get(course=course, title=row['quiz_title'].strip())
-            except Quiz.DoesNotExist:
-                errors.append(f'Row {i}: quiz "{row["quiz_title"]}" not found in course.')
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
                 continue
 
-            row_status = row.get('status', 'graded').strip() or 'graded'
-            obj, was_created = QuizScore.objects.update_or_create(
+            status_text = row_status(row).strip() or 'graded'
+            objs.append(QuizScore(
                 quiz=quiz,
                 student=student,
-                defaults={
-                    'score': float(row['score']),
-                    'status': row_status,
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
-        return Response({
-            'message': f'Quiz scores upload complete. Created: {created}, Updated: {updated}.',
-            'errors': errors,
-        })
-
-    def _handle_lab_scores(self, rows, course):
+                score=score,
+                status=status_text,
+            ))
+
+        created, updated = upsert_rows(
+            QuizScore, objs,
+            unique_fields=['quiz', 'student'],
+            update_fields=['score', 'status'],
+        )
+        refresh_assessment_rows(objs, 'quiz')
+        return created, updated, errors
+
+    def _handle_lab_scores(self, rows, columns, course, start=2):
         """
         Expected CSV columns: student_id, lab_title, date, score, max_score, attendance, remark
         """
-        required = {'student_id', 'lab_title', 'score'}
-        missing = required - set(rows[0].keys())
-        if missing:
-            return Response({'error': f'Missing columns: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        created, updated, errors = 0, 0, []
-        for i, row in enumerate(rows, start=2):
-            student = self._get_student(row['student_id'].strip())
+        student_col = columns['student_id']
+        students = self._get_students(rows, columns)
+        title_col, score_col = columns['lab_title'], columns['score']
+        labs = self._get_course_items(LabActivity, course, rows, title_col)
+        row_max_score = csv_column(columns, 'max_score')
+        row_attendance = csv_column(columns, 'attendance', 'true')
+        row_remark = csv_column(columns, 'remark')
+        row_date = csv_column(columns, 'date')
+        objs, errors = [], []
+        for i, row in enumerate(rows, start=start):
+            student = students.get(row[student_col].strip())
             if not student:
-                errors.append(f'Row {i}: student_id {row["student_id"]} not found.')
+                errors.append(f'Row {i}: student_id {row[student_col]} not found.')
+                continue
+
+            lab = labs.get(row[title_col].strip())
+            if not lab:
+                errors.append(f'Row {i}: lab "{row[title_col]}" not found in course.')
                 continue
 
             try:
-                lab = LabActivity.objects.get(course=course, title=row['lab_title'].strip())
-            except LabActivity.DoesNotExist:
-                errors.append(f'Row {i}: lab "{row["lab_title"]}" not found in course.')
+                score = float(row[score_col])
+            except ValueError:
+                errors.append(f'Row {i}: invalid score "{row[score_col]}" (expected a number).')
+                continue
+
+            try:
+                max_score = float(row_max_score(row).strip() or lab.max_score)
+            except ValueError:
+                errors.append(f'Row {i}: invalid max_score "{row_max_score(row)}" (expected a number).')
                 continue
 
             defaults = {
-                'score': float(row['score']),
-                'max_score': float(row.get('max_score', lab.max_score)),
-                'attendance': row.get('attendance', 'true').strip().lower() in ('true', '1', 'yes'),
-                'remark': row.get('remark', '').strip(),
+                'score': score,
+                'max_score': max_score,
+                'attendance': row_attendance(row).strip().lower() in CSV_TRUE_VALUES,
+                'remark': row_remark(row).strip(),
             }
-            if row.get('date'):
-                defaults['date'] = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+            date_text = row_date(row)
+            if date_text:
+                try:
+                    defaults['date'] = parse_csv_date(date_text.strip())
+                except ValueError:
+                    errors.append(f'Row {i}: invalid date format (expected YYYY-MM-DD).')
+                    continue
             else:
                 defaults['date'] = lab.date
 
-            obj, was_created = LabParticipation.objects.update_or_create(
-                lab=lab,
-                student=student,
-                defaults=defaults,
-            )
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+            objs.append(LabParticipation(lab=lab, student=student, **defaults))
 
-        return Response({
-            'message': f'Lab scores upload complete. Created: {created}, Updated: {updated}.',
-            'errors': errors,
-        })
+        created, updated = upsert_rows(
+            LabParticipation, objs,
+            unique_fields=['lab', 'student'],
+            update_fields=['score', 'max_score', 'attendance', 'remark', 'date'],
+        )
+        invalidate_dashboard((obj.student_id, course.course_id) for obj in objs)
+        return created, updated, errors
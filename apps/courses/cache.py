@@ -0,0 +1,34 @@
+# apps/courses/cache.py - cached enrolment checks
+
+from django.core.cache import cache
+
+from .models import CourseRegistration
+
+# Entries are dropped when a registration changes (apps/assessments/signals.py);
+# the TTL only bounds staleness for changes that bypass signals
+ENROLMENT_CACHE_TTL = 60 * 5
+
+
+def enrolment_cache_key(student_id, course_id):
+    return f'courses:enrolled:{student_id}:{course_id}'
+
+
+def is_enrolled(student_id, course_id):
+    """True when the student has an active registration for the course"""
+    key = enrolment_cache_key(student_id, course_id)
+    enrolled = cache.get(key)
+    if enrolled is None:
+        enrolled = CourseRegistration.objects.filter(
+            student_id=student_id,
+            course_id=course_id,
+            status='active'
+        ).exists()
+        cache.set(key, enrolled, ENROLMENT_CACHE_TTL)
+    return enrolled
+
+
+def invalidate_enrolment(pairs):
+    """Drop cached enrolment checks for an iterable of (student_id, course_id)"""
+    keys = [enrolment_cache_key(student_id, course_id) for student_id, course_id in set(pairs)]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-14 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseregistration',
+            index=models.Index(fields=['course', 'status'], name='course_regi_course__c9db7b_idx'),
+        ),
+    ]
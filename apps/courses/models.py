@@ -33,6 +33,7 @@ class CourseRegistration(models.Model):
     class Meta:
         db_table = 'course_registrations'
         unique_together = ('student', 'course')
+        indexes = [models.Index(fields=['course', 'status'])]
 
 class CourseTeaching(models.Model):
     """Teacher-Course Assignment"""
@@ -4,9 +4,11 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import F
 from django.shortcuts import get_object_or_404
+from .cache import is_enrolled
 from .models import Course, CourseRegistration
-from apps.assessments.models import Assignment, Quiz
+from apps.assessments.models import Assignment, AssignmentSubmission, Quiz, QuizScore
 from apps.assessments.serializers import AssignmentSerializer, QuizSerializer
 
 class CourseViewSet(viewsets.ViewSet):
@@ -17,22 +19,19 @@ class CourseViewSet(viewsets.ViewSet):
         """Get courses enrolled by current student"""
         student = request.user
         
-        registrations = CourseRegistration.objects.filter(
+        # Project straight to the response fields; no model instances needed
+        courses = list(CourseRegistration.objects.filter(
             student=student,
             status='active'
-        ).select_related('course')
-        
-        courses = []
-        for reg in registrations:
-            courses.append({
-                'course_id': reg.course.course_id,
-                'course_code': reg.course.course_code,
-                'course_title': reg.course.course_title,
-                'term': reg.course.term,
-                'year': reg.course.year,
-                'enrolled_date': reg.enrolled_date,
-                'status': reg.status
-            })
+        ).values(
+            'course_id',
+            'enrolled_date',
+            'status',
+            course_code=F('course__course_code'),
+            course_title=F('course__course_title'),
+            term=F('course__term'),
+            year=F('course__year'),
+        ))
         
         return Response(courses)
     
@@ -45,11 +44,7 @@ class CourseViewSet(viewsets.ViewSet):
         course = get_object_or_404(Course, course_id=pk)
         
         # Check if student is enrolled
-        if not CourseRegistration.objects.filter(
-            student=student,
-            course=course,
-            status='active'
-        ).exists():
+        if not is_enrolled(student.pk, course.course_id):
             return Response(
                 {'error': 'Not enrolled in this course'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -60,20 +55,21 @@ class CourseViewSet(viewsets.ViewSet):
             course=course
         ).order_by('week_number', 'due_date')
         
+        # Student's submissions for the whole course in one query
+        submissions = {
+            sub.assignment_id: sub
+            for sub in AssignmentSubmission.objects.filter(student=student, assignment__course=course)
+        }
+        
         # Serialize assignments
         assignment_data = []
         for assignment in assignments:
-            from apps.assessments.models import AssignmentSubmission
-            
             # Get submission status
-            try:
-                submission = AssignmentSubmission.objects.get(
-                    assignment=assignment,
-                    student=student
-                )
+            submission = submissions.get(assignment.assignment_id)
+            if submission is not None:
                 submission_status = submission.status
                 score = submission.score
-            except AssignmentSubmission.DoesNotExist:
+            else:
                 submission_status = 'not_submitted'
                 score = None
             
@@ -93,20 +89,21 @@ class CourseViewSet(viewsets.ViewSet):
             course=course
         ).order_by('week_number', 'date')
         
+        # Student's quiz scores for the whole course in one query
+        quiz_scores = {
+            qs.quiz_id: qs
+            for qs in QuizScore.objects.filter(student=student, quiz__course=course)
+        }
+        
         # Serialize quizzes
         quiz_data = []
         for quiz in quizzes:
-            from apps.assessments.models import QuizScore
-            
             # Get quiz score
-            try:
-                quiz_score = QuizScore.objects.get(
-                    quiz=quiz,
-                    student=student
-                )
+            quiz_score = quiz_scores.get(quiz.quiz_id)
+            if quiz_score is not None:
                 submission_status = quiz_score.status
                 score = quiz_score.score
-            except QuizScore.DoesNotExist:
+            else:
                 submission_status = 'not_taken'
                 score = None
             
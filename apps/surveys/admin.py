@@ -53,6 +53,7 @@ class SurveyAdmin(admin.ModelAdmin):
         'survey_id', 'course_link', 'week_number', 'student_email',
         'question_title', 'score_badge', 'done_badge', 'created_at',
     ]
+    list_select_related = ('course', 'student', 'question')
     list_filter = ['course', 'week_number', 'question', 'done']
     search_fields = ['student__email', 'student__first_name', 'student__last_name',
                      'course__course_code', 'question__title']
@@ -6,6 +6,7 @@ from django.db.models import Avg, Count
 from django.shortcuts import get_object_or_404
 
 from django.db.models import Max
+from apps.courses.cache import is_enrolled
 from apps.courses.models import Course, CourseRegistration, CourseTeaching
 from apps.assessments.models import Attendance
 from .models import Question, Survey
@@ -37,9 +38,7 @@ def submit_survey(request):
     course = get_object_or_404(Course, course_id=data['course_id'])
     week_number = data['week_number']
 
-    if not CourseRegistration.objects.filter(
-        student=student, course=course, status='active'
-    ).exists():
+    if not is_enrolled(student.pk, course.course_id):
         return Response({'error': 'Not enrolled in this course.'}, status=status.HTTP_403_FORBIDDEN)
 
     created, updated = 0, 0
@@ -0,0 +1,47 @@
+# apps/users/authentication.py - DRF token authentication with a cached lookup
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import TOKEN_CACHE_TTL, token_cache_enabled, token_cache_key
+from .models import User
+
+# Cached user columns; the password hash is never written to the cache and stays deferred
+# on the rebuilt user, so it is loaded from the database only if something reads it
+_CACHED_USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps the token's user as plain column values in the default
+    cache, so repeat requests with the same key skip the token + user SELECT. Only used
+    when the cache is shared by every worker (token_cache_enabled); otherwise it is the
+    stock lookup.
+    """
+
+    def authenticate_credentials(self, key):
+        if not token_cache_enabled():
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        entry = cache.get(cache_key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            entry = {
+                'created': token.created,
+                'user': {name: getattr(user, name) for name in _CACHED_USER_FIELDS},
+            }
+            cache.set(cache_key, entry, TOKEN_CACHE_TTL)
+            return user, token
+
+        values = entry['user']
+        # Deactivation invalidates the entry; checked again in case that was bypassed
+        if not values['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        user = User.from_db(DEFAULT_DB_ALIAS, _CACHED_USER_FIELDS, [values[name] for name in _CACHED_USER_FIELDS])
+        token = Token(key=key, user=user, created=entry['created'])
+        return user, token
@@ -0,0 +1,28 @@
+# apps/users/cache.py - cached token authentication lookups
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Entries are dropped when the token or its user changes (apps/users/signals.py);
+# the TTL only bounds staleness for changes that bypass signals
+TOKEN_CACHE_TTL = 60 * 5
+
+
+def token_cache_enabled():
+    """
+    Only cache lookups in a cache every worker shares: a per-process cache would keep
+    accepting a token after another worker handled its logout, reset or deactivation
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def token_cache_key(key):
+    return f'users:token:{key}'
+
+
+def invalidate_tokens(keys):
+    """Drop cached token + user lookups for an iterable of token keys"""
+    cache_keys = [token_cache_key(key) for key in set(keys)]
+    if cache_keys:
+        cache.delete_many(cache_keys)
@@ -1,151 +1,71 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+# Bodies live in templates/emails/<name>.html and .txt; the template loader caches them
+# after the first render
+OTP_ACCENT = '#2196F3'
+PASSWORD_RESET_ACCENT = '#EF4444'
+
+# SMTP round trips run here instead of on the request thread; two workers keep a burst of
+# sign-ups from opening a connection each
+_mail_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='email')
+
+
+def _log_send_failure(send, future):
+    # The request has already returned 200, so the log is the only place a failure shows up;
+    # the recipient is left out of the message
+    exc = future.exception()
+    if exc is not None:
+        logger.error("%s failed", send.__name__, exc_info=exc)
+
+
+def send_in_background(send, *args):
+    """Queue send(*args) on the mail workers; failures are logged, never raised to the caller"""
+    future = _mail_executor.submit(send, *args)
+    future.add_done_callback(lambda done: _log_send_failure(send, done))
+
+
+def _render_email(name, context):
+    """Render the (plain, html) bodies of templates/emails/<name>"""
+    return (
+        render_to_string(f'emails/{name}.txt', context),
+        render_to_string(f'emails/{name}.html', context),
+    )
+
 
 def send_otp_email(email, otp_code):
-    """Send OTP email to user"""
+    """Send OTP email to user; raises if the mail cannot be sent"""
     subject = 'Student Progress - Verify Your Email'
-    
-    # HTML message
-    html_message = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background-color: #2196F3; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-            .content {{ background-color: #f9f9f9; padding: 30px; border-radius: 0 0 5px 5px; }}
-            .otp-box {{ background-color: white; border: 2px solid #2196F3; padding: 20px; text-align: center; font-size: 32px; font-weight: bold; letter-spacing: 5px; margin: 20px 0; border-radius: 5px; }}
-            .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Email Verification</h1>
-            </div>
-            <div class="content">
-                <p>Hello!</p>
-                <p>Thank you for registering with Student Progress System. To complete your registration, please use the following One-Time Password (OTP):</p>
-                
-                <div class="otp-box">
-                    {otp_code}
-                </div>
-                
-                <p><strong>This OTP will expire in 10 minutes.</strong></p>
-                <p>If you didn't request this verification, please ignore this email.</p>
-                
-                <div class="footer">
-                    <p>© 2026 Student Progress System - KIC</p>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Plain text version
-    plain_message = f"""
-    Student Progress - Email Verification
-    
-    Hello!
-    
-    Thank you for registering with Student Progress System.
-    
-    Your verification code is: {otp_code}
-    
-    This OTP will expire in 10 minutes.
-    
-    If you didn't request this verification, please ignore this email.
-    
-    © 2026 Student Progress System - KIC
-    """
-    
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        return False
+    plain_message, html_message = _render_email('otp', {'otp_code': otp_code, 'accent': OTP_ACCENT})
+
+    send_mail(
+        subject=subject,
+        message=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        html_message=html_message,
+        fail_silently=False,
+    )
 
 
 def send_password_reset_email(email, otp_code):
-    """Send password reset OTP email"""
+    """Send password reset OTP email; raises if the mail cannot be sent"""
     subject = 'EduRisk - Password Reset Code'
+    plain_message, html_message = _render_email(
+        'password_reset', {'otp_code': otp_code, 'accent': PASSWORD_RESET_ACCENT}
+    )
 
-    html_message = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background-color: #EF4444; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-            .content {{ background-color: #f9f9f9; padding: 30px; border-radius: 0 0 5px 5px; }}
-            .otp-box {{ background-color: white; border: 2px solid #EF4444; padding: 20px; text-align: center; font-size: 32px; font-weight: bold; letter-spacing: 5px; margin: 20px 0; border-radius: 5px; }}
-            .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Password Reset</h1>
-            </div>
-            <div class="content">
-                <p>Hello!</p>
-                <p>We received a request to reset your password. Use the following code to reset it:</p>
-
-                <div class="otp-box">
-                    {otp_code}
-                </div>
-
-                <p><strong>This code will expire in 10 minutes.</strong></p>
-                <p>If you didn't request a password reset, please ignore this email. Your password will remain unchanged.</p>
-
-                <div class="footer">
-                    <p>&copy; 2026 EduRisk - Student Progress System</p>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-
-    plain_message = f"""
-    EduRisk - Password Reset
-
-    Hello!
-
-    We received a request to reset your password.
-
-    Your password reset code is: {otp_code}
-
-    This code will expire in 10 minutes.
-
-    If you didn't request a password reset, please ignore this email.
-
-    &copy; 2026 EduRisk - Student Progress System
-    """
-
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to send password reset email: {e}")
-        return False
\ No newline at end of file
+    send_mail(
+        subject=subject,
+        message=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        html_message=html_message,
+        fail_silently=False,
+    )
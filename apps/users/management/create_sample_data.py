@@ -1,20 +1,33 @@
 # apps/users/management/commands/create_sample_data.py
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from apps.courses.models import Course, CourseRegistration
+from apps.analytics.cache import invalidate_dashboard
 from apps.assessments.models import Attendance, Assignment, AssignmentSubmission, Quiz, QuizScore
-from datetime import datetime, timedelta
+from apps.assessments.utils import refresh_assessment_rows, refresh_course_assessments
+from datetime import timedelta
 import random
 
 User = get_user_model()
 
 class Command(BaseCommand):
     help = 'Create sample data for testing'
+
+    # Rows per INSERT for the bulk-created records
+    batch_size = 100
     
+    # One commit for the whole run; a failure part-way leaves no partial sample set
+    @transaction.atomic
     def handle(self, *args, **kwargs):
         self.stdout.write('Creating sample data...')
         
+        # Every date below is relative to one clock reading
+        now = timezone.now()
+        today = timezone.localdate(now)
+        
         # Create teacher
         teacher, created = User.objects.get_or_create(
             email='teacher@example.com',
@@ -69,62 +82,94 @@ class Command(BaseCommand):
             defaults={'status': 'active'}
         )
         
-        # Create attendance records
-        for week in range(1, 6):
-            for day in range(1, 4):
-                date = datetime.now().date() - timedelta(days=(5-week)*7 + (3-day))
-                Attendance.objects.get_or_create(
-                    student=student,
-                    course=course,
-                    date=date,
-                    defaults={
-                        'week_number': week,
-                        'status': random.choice(['present', 'present', 'absent']),
-                        'section': 'section-one'
-                    }
-                )
-        
-        # Create assignments
-        for week in range(1, 6):
-            assignment, created = Assignment.objects.get_or_create(
+        # Create attendance records, skipping dates the student already has
+        attendance_dates = [
+            (week, today - timedelta(days=(5-week)*7 + (3-day)))
+            for week in range(1, 6)
+            for day in range(1, 4)
+        ]
+        existing_dates = set(Attendance.objects.filter(
+            student=student,
+            course=course,
+            date__in=[date for _, date in attendance_dates]
+        ).values_list('date', flat=True))
+        Attendance.objects.bulk_create([
+            Attendance(
+                student=student,
                 course=course,
-                title=f'Week {week} Assignment',
-                defaults={
-                    'description': f'Assignment for week {week}',
-                    'due_date': datetime.now() + timedelta(days=week*7),
-                    'max_score': 100,
-                    'week_number': week
-                }
+                date=date,
+                week_number=week,
+                status=random.choice(['present', 'present', 'absent']),
+                section='section-one'
             )
-            
-            # Create submission
-            AssignmentSubmission.objects.get_or_create(
+            for week, date in attendance_dates
+            if date not in existing_dates
+        ], batch_size=self.batch_size)
+        
+        # Create assignments, then one submission each
+        assignments = self.bulk_get_or_create_items(Assignment, course, {
+            f'Week {week} Assignment': {
+                'description': f'Assignment for week {week}',
+                'due_date': now + timedelta(days=week*7),
+                'max_score': 100,
+                'week_number': week
+            }
+            for week in range(1, 6)
+        })
+        submissions = [
+            AssignmentSubmission(
                 student=student,
                 assignment=assignment,
-                defaults={
-                    'score': random.randint(50, 95),
-                    'status': 'graded'
-                }
+                score=random.randint(50, 95),
+                status='graded'
             )
+            for assignment in assignments
+        ]
+        AssignmentSubmission.objects.bulk_create(submissions, batch_size=self.batch_size, ignore_conflicts=True)
         
-        # Create quizzes
-        for week in range(1, 6):
-            quiz, created = Quiz.objects.get_or_create(
-                course=course,
-                title=f'Week {week} Quiz',
-                defaults={
-                    'date': datetime.now().date() - timedelta(days=(5-week)*7),
-                    'max_score': 100,
-                    'week_number': week
-                }
-            )
-            
-            QuizScore.objects.get_or_create(
+        # Create quizzes, then one score each
+        quizzes = self.bulk_get_or_create_items(Quiz, course, {
+            f'Week {week} Quiz': {
+                'date': today - timedelta(days=(5-week)*7),
+                'max_score': 100,
+                'week_number': week
+            }
+            for week in range(1, 6)
+        })
+        quiz_scores = [
+            QuizScore(
                 student=student,
                 quiz=quiz,
-                defaults={
-                    'score': random.randint(60, 100)
-                }
+                score=random.randint(60, 100)
             )
+            for quiz in quizzes
+        ]
+        QuizScore.objects.bulk_create(quiz_scores, batch_size=self.batch_size, ignore_conflicts=True)
+        
+        # bulk_create skips the assessment signals
+        refresh_assessment_rows(submissions, 'assignment')
+        refresh_assessment_rows(quiz_scores, 'quiz')
+        invalidate_dashboard([(student.pk, course.course_id)])
         
-        self.stdout.write(self.style.SUCCESS('Sample data created successfully!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Sample data created successfully!'))
+
+    def bulk_get_or_create_items(self, model, course, defaults_by_title):
+        """
+        Assignments/quizzes of course by title, inserting the missing ones in one
+        bulk_create; returns them in defaults_by_title order.
+        """
+        items = {item.title: item for item in model.objects.filter(course=course, title__in=list(defaults_by_title))}
+        missing = [title for title in defaults_by_title if title not in items]
+        if missing:
+            model.objects.bulk_create(
+                [model(course=course, title=title, **defaults_by_title[title]) for title in missing],
+                batch_size=self.batch_size,
+            )
+            # Re-read for primary keys; SQLite bulk_create does not return them on every version
+            items.update(
+                (item.title, item)
+                for item in model.objects.filter(course=course, title__in=missing)
+            )
+            # bulk_create skips assessment_changed; new items move every enrolled student's totals
+            refresh_course_assessments(course.course_id)
+        return [items[title] for title in defaults_by_title]
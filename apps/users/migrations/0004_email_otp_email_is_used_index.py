@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-14 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_emailotp_alter_loginhistory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailotp',
+            index=models.Index(fields=['email', 'is_used'], name='email_otps_email_29630b_idx'),
+        ),
+    ]
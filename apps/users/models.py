@@ -1,10 +1,10 @@
 # apps/users/models.py - ADD OTP model
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from datetime import timedelta
-import random
+import secrets
 
 class User(AbstractUser):
     USER_TYPES = (
@@ -57,6 +57,8 @@ class EmailOTP(models.Model):
     class Meta:
         db_table = 'email_otps'
         ordering = ['-created_at']
+        # Every OTP lookup and the invalidation in create_otp filter by email (and is_used)
+        indexes = [models.Index(fields=['email', 'is_used'])]
     
     def is_valid(self):
         """Check if OTP is still valid"""
@@ -67,12 +69,13 @@ class EmailOTP(models.Model):
     
     @staticmethod
     def generate_otp():
-        """Generate 6-digit OTP"""
-        return str(random.randint(100000, 999999))
+        """Generate 6-digit OTP from the OS CSPRNG"""
+        return str(secrets.randbelow(900000) + 100000)
     
     @classmethod
+    @transaction.atomic
     def create_otp(cls, email, temp_data=None):
-        """Create new OTP for email"""
+        """Create new OTP for email; the invalidation and the insert commit together"""
         # Invalidate old OTPs for this email
         cls.objects.filter(email=email, is_used=False).update(is_used=True)
         
@@ -3,9 +3,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import User
+from django.db.models import Q
 from .models import User, EmailOTP
-from .email_service import send_otp_email
 
 class RegisterRequestSerializer(serializers.Serializer):
     """Step 1: Request OTP"""
@@ -19,26 +18,33 @@ class RegisterRequestSerializer(serializers.Serializer):
     gender = serializers.IntegerField(required=False, allow_null=True)
     country = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
     
+    # Uniqueness of email / student_id / username is checked together in validate()
+    taken_messages = {
+        'email': "This email is already registered.",
+        'student_id': "This student ID is already registered.",
+        'username': "This username is already taken.",
+    }
+    
     def validate_email(self, value):
         if not value.lower().endswith('kic.ac.jp'):
             raise serializers.ValidationError("Please use your KIC email address (@kic.ac.jp)")
 
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("This email is already registered.")
-
         return value.lower()
     
-    def validate_student_id(self, value):
-        if User.objects.filter(student_id=value).exists():
-            raise serializers.ValidationError("This student ID is already registered.")
-        return value
-    
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("This username is already taken.")
-        return value
-    
     def validate(self, attrs):
+        # One query for all three unique fields; the DB constraints still back this up
+        wanted = {field: attrs[field] for field in self.taken_messages}
+        taken = {}
+        matches = User.objects.filter(
+            Q(email=wanted['email']) | Q(student_id=wanted['student_id']) | Q(username=wanted['username'])
+        ).values_list(*wanted)
+        for row in matches:
+            for field, value in zip(wanted, row):
+                if value == wanted[field]:
+                    taken[field] = self.taken_messages[field]
+        if taken:
+            raise serializers.ValidationError(taken)
+
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "Passwords do not match."})
         return attrs
@@ -71,108 +77,6 @@ class VerifyOTPSerializer(serializers.Serializer):
         
         return attrs
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
-    """Serializer for user registration (Sign Up)"""
-    password = serializers.CharField(
-        write_only=True, 
-        required=True, 
-        validators=[validate_password]
-    )
-    password_confirm = serializers.CharField(write_only=True, required=True)
-    
-    class Meta:
-        model = User
-        fields = [
-            'email', 'username', 'password', 'password_confirm',
-            'first_name', 'last_name', 'student_id', 'user_type',
-            'phone', 'country', 'date_of_birth'
-        ]
-    
-    def validate(self, attrs):
-        # Check if passwords match
-        if attrs['password'] != attrs['password_confirm']:
-            raise serializers.ValidationError({
-                "password": "Password fields didn't match."
-            })
-        return attrs
-    
-    def validate_email(self, value):
-        if not value.lower().endswith('kic.ac.jp'):
-            raise serializers.ValidationError("Please use your KIC email address (@kic.ac.jp)")
-
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("This email is already registered.")
-        return value
-    
-    def validate_student_id(self, value):
-        # Check if student ID already exists
-        if value and User.objects.filter(student_id=value).exists():
-            raise serializers.ValidationError("This student ID is already registered.")
-        return value
-    
-    def create(self, validated_data):
-        # Remove password_confirm as it's not part of the model
-        validated_data.pop('password_confirm')
-        
-        # Create user with encrypted password
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            username=validated_data['username'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', ''),
-            student_id=validated_data.get('student_id'),
-            user_type=validated_data.get('user_type', 'student'),
-            phone=validated_data.get('phone'),
-            country=validated_data.get('country'),
-            date_of_birth=validated_data.get('date_of_birth'),
-        )
-        return user
-
-
-class UserLoginSerializer(serializers.Serializer):
-    """Serializer for user login"""
-    email = serializers.EmailField(required=True)
-    password = serializers.CharField(
-        required=True,
-        write_only=True,
-        style={'input_type': 'password'}
-    )
-    
-    def validate(self, attrs):
-        email = attrs.get('email')
-        password = attrs.get('password')
-        
-        if email and password:
-            # Authenticate user
-            user = authenticate(
-                request=self.context.get('request'),
-                username=email,
-                password=password
-            )
-            
-            if not user:
-                raise serializers.ValidationError(
-                    'Unable to log in with provided credentials.',
-                    code='authorization'
-                )
-            
-            if not user.is_active:
-                raise serializers.ValidationError(
-                    'User account is disabled.',
-                    code='authorization'
-                )
-            
-        else:
-            raise serializers.ValidationError(
-                'Must include "email" and "password".',
-                code='authorization'
-            )
-        
-        attrs['user'] = user
-        return attrs
-
-
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile"""
     full_name = serializers.CharField(source='get_full_name', read_only=True)
@@ -187,6 +91,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user_id', 'email', 'created_at']
 
+    def update(self, instance, validated_data):
+        # UPDATE only the submitted columns (and updated_at), not the whole row
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     """Serializer for password change"""
@@ -210,60 +121,8 @@ class ChangePasswordSerializer(serializers.Serializer):
         if not user.check_password(value):
             raise serializers.ValidationError("Old password is incorrect.")
         return value
-    
-class RegisterSerializer(serializers.ModelSerializer):
-    password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
-    password2 = serializers.CharField(write_only=True, required=True)
-    
-    class Meta:
-        model = User
-        fields = ['email', 'username', 'password', 'password2', 'first_name', 'last_name', 'student_id']
-        extra_kwargs = {
-            'first_name': {'required': True},
-            'last_name': {'required': True},
-            'student_id': {'required': True}
-        }
-    
-    def validate_email(self, value):
-        """Validate that email is from kic.ac.jp domain"""
-        # if not value.lower().endswith('kic.ac.jp'):
-        #     raise serializers.ValidationError(
-        #         "Please use KIC email domain (kic.ac.jp)"
-        #     )
-        
-        # Check if email already exists
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("This email is already registered.")
-        
-        return value.lower()
-    
-    def validate_student_id(self, value):
-        """Validate that student ID is unique"""
-        if User.objects.filter(student_id=value).exists():
-            raise serializers.ValidationError("A user with this student ID already exists.")
-        return value
-    
-    def validate(self, attrs):
-        """Validate that passwords match"""
-        if attrs['password'] != attrs['password2']:
-            raise serializers.ValidationError({"password": "Password fields didn't match."})
-        return attrs
-    
-    def create(self, validated_data):
-        """Create new user"""
-        validated_data.pop('password2')
-        
-        user = User.objects.create_user(
-            email=validated_data['email'],
-            username=validated_data['username'],
-            password=validated_data['password'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            student_id=validated_data['student_id'],
-            user_type='student'
-        )
-        
-        return user
+
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
@@ -0,0 +1,23 @@
+# apps/users/signals.py - keep cached token lookups in sync with tokens and their users
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .cache import invalidate_tokens
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+# Profile edits, password changes and deactivation all go through save(); deleting a user
+# cascades to its token, which is handled above
+@receiver(post_save, sender=User)
+def token_user_changed(sender, instance, update_fields=None, **kwargs):
+    # Admin logins only touch last_login, which nothing reads from the cached user
+    if update_fields == frozenset({'last_login'}):
+        return
+    invalidate_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
@@ -0,0 +1,35 @@
+# apps/users/throttling.py - per-address rate limits for the unauthenticated auth endpoints
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class EmailRateThrottle(SimpleRateThrottle):
+    """
+    Limits requests per submitted email address (falling back to the client IP when none is
+    sent), so repeated sign-up, resend and login attempts are refused from the cache before
+    they reach an OTP query, a password hash or an SMTP send. Each endpoint has its own
+    subclass and scope, so one endpoint's budget does not lock a user out of the others.
+    """
+    # Kept when the default cache is a DummyCache (settings.CACHES)
+    cache = caches['throttle']
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if isinstance(email, str) and email.strip():
+            ident = email.strip().lower()
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class RegisterRateThrottle(EmailRateThrottle):
+    scope = 'auth_register'
+
+
+class ResendOTPRateThrottle(EmailRateThrottle):
+    scope = 'auth_resend'
+
+
+class LoginRateThrottle(EmailRateThrottle):
+    scope = 'auth_login'
@@ -6,6 +6,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from .models import User, EmailOTP
 from .serializers import (
     RegisterRequestSerializer,
@@ -14,11 +16,13 @@ from .serializers import (
     UserProfileSerializer,
     ResetPasswordSerializer,
 )
-from .email_service import send_otp_email, send_password_reset_email
+from .email_service import send_in_background, send_otp_email, send_password_reset_email
+from .throttling import LoginRateThrottle, RegisterRateThrottle, ResendOTPRateThrottle
 
 class AuthViewSet(viewsets.ViewSet):
     
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny],
+            throttle_classes=[RegisterRateThrottle])
     def register_request(self, request):
         """Step 1: Validate data and send OTP"""
         serializer = RegisterRequestSerializer(data=request.data)
@@ -26,11 +30,12 @@ class AuthViewSet(viewsets.ViewSet):
         if serializer.is_valid():
             email = serializer.validated_data['email']
             
-            # Create OTP and save temp data
+            # Create OTP and save temp data; the password is kept hashed, and hashing it
+            # here keeps that cost off verify_otp
             temp_data = {
                 'email': email,
                 'username': serializer.validated_data['username'],
-                'password': serializer.validated_data['password'],
+                'password_hash': make_password(serializer.validated_data['password']),
                 'first_name': serializer.validated_data['first_name'],
                 'last_name': serializer.validated_data['last_name'],
                 'student_id': serializer.validated_data['student_id'],
@@ -42,19 +47,14 @@ class AuthViewSet(viewsets.ViewSet):
             
             otp = EmailOTP.create_otp(email, temp_data)
             
-            # Send OTP email
-            email_sent = send_otp_email(email, otp.otp_code)
+            # Send OTP email without holding the response on SMTP
+            send_in_background(send_otp_email, email, otp.otp_code)
             
-            if email_sent:
-                return Response({
-                    'message': 'OTP sent to your email',
-                    'email': email,
-                    'expires_in': '10 minutes'
-                }, status=status.HTTP_200_OK)
-            else:
-                return Response({
-                    'error': 'Failed to send OTP email. Please try again.'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'message': 'OTP sent to your email',
+                'email': email,
+                'expires_in': '10 minutes'
+            }, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -74,27 +74,32 @@ class AuthViewSet(viewsets.ViewSet):
                     'error': 'Registration data not found. Please start registration again.'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Create user
+            # Create user, use up the OTP and issue the token in one commit, so a failure
+            # part-way leaves neither an orphan account nor a spent OTP
             try:
-                user = User.objects.create_user(
-                    email=temp_data['email'],
-                    username=temp_data['username'],
-                    password=temp_data['password'],
-                    first_name=temp_data['first_name'],
-                    last_name=temp_data['last_name'],
-                    student_id=temp_data['student_id'],
-                    user_type='student',
-                    email_verified=True,
-                    gender=temp_data.get('gender'),
-                    country=temp_data.get('country'),
-                )
-                
-                # Mark OTP as used
-                otp.is_used = True
-                otp.save()
-                
-                # Create token
-                token, _ = Token.objects.get_or_create(user=user)
+                # Registrations started before password_hash was stored carry the raw password
+                password_hash = temp_data.get('password_hash') or make_password(temp_data['password'])
+                with transaction.atomic():
+                    # create_user's normalisation, with the password already hashed
+                    user = User.objects.create(
+                        email=User.objects.normalize_email(temp_data['email']),
+                        username=User.normalize_username(temp_data['username']),
+                        password=password_hash,
+                        first_name=temp_data['first_name'],
+                        last_name=temp_data['last_name'],
+                        student_id=temp_data['student_id'],
+                        user_type='student',
+                        email_verified=True,
+                        gender=temp_data.get('gender'),
+                        country=temp_data.get('country'),
+                    )
+                    
+                    # Mark OTP as used
+                    otp.is_used = True
+                    otp.save(update_fields=['is_used'])
+                    
+                    # New user, so there is no token to look up first
+                    token = Token.objects.create(user=user)
                 
                 return Response({
                     'message': 'Registration successful',
@@ -116,7 +121,8 @@ class AuthViewSet(viewsets.ViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny],
+            throttle_classes=[ResendOTPRateThrottle])
     def resend_otp(self, request):
         """Resend OTP"""
         email = request.data.get('email')
@@ -136,19 +142,15 @@ class AuthViewSet(viewsets.ViewSet):
         new_otp = EmailOTP.create_otp(email, latest_otp.temp_data)
         
         # Send email
-        email_sent = send_otp_email(email, new_otp.otp_code)
+        send_in_background(send_otp_email, email, new_otp.otp_code)
         
-        if email_sent:
-            return Response({
-                'message': 'OTP resent successfully',
-                'expires_in': '10 minutes'
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'error': 'Failed to send OTP email'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'OTP resent successfully',
+            'expires_in': '10 minutes'
+        }, status=status.HTTP_200_OK)
     
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny],
+            throttle_classes=[LoginRateThrottle])
     def login(self, request):
         """Login user"""
         serializer = LoginSerializer(data=request.data)
@@ -183,7 +185,8 @@ class AuthViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def logout(self, request):
         """Logout user"""
-        request.user.auth_token.delete()
+        # A single DELETE, and a no-op for session logins that never had a token
+        Token.objects.filter(user=request.user).delete()
         return Response({'message': 'Logged out successfully'})
 
     
@@ -219,22 +222,18 @@ class AuthViewSet(viewsets.ViewSet):
 
         try:
             otp = EmailOTP.create_otp(email)
-            email_sent = send_password_reset_email(email, otp.otp_code)
         except Exception:
             return Response({
                 'error': 'Failed to send email. Please try again.'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if email_sent:
-            return Response({
-                'message': 'Password reset code sent to your email',
-                'email': email,
-                'expires_in': '10 minutes'
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'error': 'Failed to send email. Please try again.'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        send_in_background(send_password_reset_email, email, otp.otp_code)
+
+        return Response({
+            'message': 'Password reset code sent to your email',
+            'email': email,
+            'expires_in': '10 minutes'
+        }, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def reset_password(self, request):
@@ -249,10 +248,13 @@ class AuthViewSet(viewsets.ViewSet):
             try:
                 user = User.objects.get(email=email)
                 user.set_password(new_password)
-                user.save()
 
-                otp.is_used = True
-                otp.save()
+                # New password and spent OTP commit together
+                with transaction.atomic():
+                    user.save(update_fields=['password', 'updated_at'])
+
+                    otp.is_used = True
+                    otp.save(update_fields=['is_used'])
 
                 return Response({
                     'message': 'Password reset successfully. You can now login with your new password.'
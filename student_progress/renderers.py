@@ -0,0 +1,22 @@
+# student_progress/renderers.py - faster JSON output for API responses
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson doesn't know (Decimal, lazy translation strings, querysets...) and
+# datetimes go through DRF's own encoder so the output matches JSONRenderer
+_drf_default = JSONEncoder().default
+
+
+class OrjsonRenderer(JSONRenderer):
+    """JSONRenderer that serializes with orjson instead of the stdlib json module"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(
+            data,
+            default=_drf_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
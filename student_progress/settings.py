@@ -116,6 +116,14 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Argon2 for new hashes (argon2-cffi, cost in apps/users/hashers.py); PBKDF2 entries still
+# verify older hashes, which are rehashed with Argon2 on the user's next successful login
+PASSWORD_HASHERS = [
+    'apps.users.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Asia/Yangon'
 USE_I18N = True
@@ -139,17 +147,74 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'student_progress.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Per-email limits for register_request / resend_otp / login (apps.users.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_register': '5/min',
+        'auth_resend': '5/min',
+        'auth_login': '5/min',
+    },
 }
 
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Cache - Redis when REDIS_URL is set (render.yaml provisions it). The caches are dropped by
+# signals in the worker that made the change, so a per-process cache would leave the other
+# workers serving stale data: outside DEBUG, without Redis, caching is turned off instead.
+# Throttle counts go to their own alias, which stays in process memory in that case.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': (
+                'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+                else 'django.core.cache.backends.dummy.DummyCache'
+            ),
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttle',
+        },
+    }
+
+# Logging - app loggers at INFO by default; set LOG_LEVEL=DEBUG to see per-prediction details
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # student_progress/settings.py - ADD email configuration
 
 # Email Configuration